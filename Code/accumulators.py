@@ -0,0 +1,389 @@
+import math
+import re
+from array import array
+from collections import defaultdict, Counter
+
+from sketches import KLLSketch, TermCounter
+
+# === Parsing ===
+def try_parse_float(val):
+    try:
+        return float(val)
+    except:
+        return None
+
+# === Streaming Accumulators ===
+class RunningStats:
+    """One-pass count/mean/min/max/std for a numeric column (Welford).
+
+    Pass ``quantile_k`` to also keep a KLL sketch for streaming percentiles.
+    """
+
+    __slots__ = ("count", "mean", "m2", "min", "max", "sketch")
+
+    def __init__(self, quantile_k=None):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.sketch = KLLSketch(quantile_k) if quantile_k else None
+
+    @classmethod
+    def from_values(cls, values):
+        acc = cls()
+        for x in values:
+            acc.update(x)
+        return acc
+
+    @classmethod
+    def from_moments(cls, count, mean, m2, min_val, max_val):
+        # A column summarised elsewhere (e.g. by pandas/Polars), ready to merge()
+        acc = cls()
+        if count:
+            acc.count, acc.mean, acc.m2, acc.min, acc.max = count, mean, m2, min_val, max_val
+        return acc
+
+    def update(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if self.min is None or x < self.min:
+            self.min = x
+        if self.max is None or x > self.max:
+            self.max = x
+        if self.sketch is not None:
+            self.sketch.update(x)
+
+    def merge(self, other):
+        if self.sketch is not None and other.sketch is not None:
+            self.sketch.merge(other.sketch)
+        if not other.count:
+            return self
+        if not self.count:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def as_dict(self, percentiles=()):
+        if not self.count:
+            stats = {'count': 0, 'mean': None, 'min': None, 'max': None, 'std': None}
+        else:
+            std = (self.m2 / self.count) ** 0.5 if self.count > 1 else 0
+            stats = {'count': self.count, 'mean': self.mean, 'min': self.min, 'max': self.max, 'std': std}
+        if percentiles and self.sketch is not None:
+            for q, val in zip(percentiles, self.sketch.quantiles(percentiles)):
+                stats[percentile_label(q)] = val
+        return stats
+
+
+def percentile_label(q):
+    return f"p{q * 100:g}"
+
+
+def percentile_text(stats, multiline=False):
+    sep = "\n  " if multiline else ", "
+    return "".join(f"{sep}{key}: {val}" for key, val in stats.items() if key[0] == 'p' and key[1:2].isdigit())
+
+
+def counter_summary(counter):
+    if not isinstance(counter, Counter):
+        return counter.summary()
+    if not counter:
+        return None
+    top_val, freq = counter.most_common(1)[0]
+    return {'count': sum(counter.values()), 'unique': len(counter), 'top': top_val, 'freq': freq}
+
+
+# === Compact Raw Values ===
+class NumericBuffer:
+    """Exact stand-in for RunningStats that keeps every value in an array('d').
+
+    8 bytes per value instead of a boxed float in a list; count/mean/min/max/std
+    and exact (linearly interpolated) percentiles are computed over the buffer.
+    """
+
+    __slots__ = ("values",)
+
+    def __init__(self):
+        self.values = array('d')
+
+    @property
+    def count(self):
+        return len(self.values)
+
+    def update(self, x):
+        self.values.append(x)
+
+    def merge(self, other):
+        self.values.extend(other.values)
+        return self
+
+    def as_dict(self, percentiles=()):
+        values = self.values
+        n = len(values)
+        if not n:
+            stats = {'count': 0, 'mean': None, 'min': None, 'max': None, 'std': None}
+        else:
+            mean = math.fsum(values) / n
+            std = math.sqrt(math.fsum((x - mean) ** 2 for x in values) / n) if n > 1 else 0
+            stats = {'count': n, 'mean': mean, 'min': min(values), 'max': max(values), 'std': std}
+        if percentiles and n:
+            ordered = sorted(values)
+            for q in percentiles:
+                pos = q * (n - 1)
+                lo = int(pos)
+                hi = min(lo + 1, n - 1)
+                stats[percentile_label(q)] = ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+        return stats
+
+
+class StringTable:
+    """Shared dictionary for EncodedValues and group ids: each distinct string is stored once and given a dense code."""
+
+    def __init__(self):
+        self.codes = {}
+        self.strings = []
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+
+
+_SHARED_TABLE = StringTable()
+_SHARED_IDS = StringTable()  # group key ids (page_id, ad_id, Facebook_Id, ...) across every file of a run
+KEY_BITS = 32  # a multi-column group key packs one id code per column into a single int
+_KEY_MASK = (1 << KEY_BITS) - 1
+
+
+class EncodedValues:
+    """Raw string column as array('I') codes into a StringTable shared by every column in the process.
+
+    Codes follow first appearance, so ``summary`` breaks ties for ``top`` the
+    way Counter.most_common does. Columns pickled from pool workers carry their
+    own table and are re-coded on merge.
+    """
+
+    def __init__(self, table=None):
+        self.table = _SHARED_TABLE if table is None else table
+        self.codes = array('I')
+
+    def __bool__(self):
+        return bool(self.codes)
+
+    def add(self, value):
+        self.codes.append(self.table.code(value))
+
+    def update(self, other):
+        if other.table is self.table:
+            self.codes.extend(other.codes)
+        else:
+            recode = array('I', map(self.table.code, other.table.strings))
+            self.codes.extend(recode[code] for code in other.codes)
+        return self
+
+    def summary(self):
+        if not self.codes:
+            return None
+        counts = Counter(self.codes)
+        top, freq = counts.most_common(1)[0]
+        return {'count': len(self.codes), 'unique': len(counts), 'top': self.table.strings[top], 'freq': freq}
+
+
+# === Free Text ===
+_TERM = re.compile(r"[#@]?\w[\w']+")
+STOPWORDS = frozenset("""the and for are but not you your with this that from have has had was were will would
+can could our out all any its it's his her they them their there what when who how why which about into
+just than then also more been being over only some such very via amp https http www com""".split())
+
+
+class TextProfile:
+    """Summary of a free-text column that never keeps a value.
+
+    Counts rows and empty cells, streams the character length of the rest into
+    a RunningStats and tokenises them into a TermCounter, so memory is fixed
+    however many distinct messages the column holds.
+    """
+
+    def __init__(self, top_n=10, width=2 ** 14):
+        self.rows = 0
+        self.empty = 0
+        self.lengths = RunningStats()
+        self.terms = TermCounter(top_n, width)
+
+    def add(self, value):
+        self.rows += 1
+        value = value.strip() if value else ""
+        if not value:
+            self.empty += 1
+            return
+        self.lengths.update(len(value))
+        add = self.terms.add
+        for token in _TERM.findall(value.lower()):
+            if token not in STOPWORDS:
+                add(token)
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.empty += other.empty
+        self.lengths.merge(other.lengths)
+        self.terms.merge(other.terms)
+        return self
+
+    def summary(self):
+        return {'rows': self.rows, 'empty_rate': self.empty / self.rows if self.rows else None,
+                'length': self.lengths.as_dict(), 'terms': self.terms.top()}
+
+
+# === Mergeable Partial State ===
+class PartialStats:
+    """Per-column accumulators for one scan (or one chunk of a scan).
+
+    With ``key_cols`` set, numeric values are folded into per-group (sum, count)
+    pairs instead, so Part 2/3 group means can be built after merging. Groups
+    are keyed by int: the key ids are interned in ``id_table`` (shared by every
+    PartialStats in the process) and packed KEY_BITS per column, so no tuple of
+    long hex ids is built per row. Only statistics over the group means are
+    reported, so the ids themselves are only looked up to re-code keys in merge.
+    ``counter_factory`` may return a sketch (see sketches.ApproxCounter) in
+    place of an exact Counter for the non-numeric columns, and ``stats_factory``
+    a RunningStats that also tracks percentiles. ``text_cols`` get a
+    TextProfile from ``text_factory`` each instead of a value count; they are
+    profiled by ungrouped partials only, as the profile ignores groups.
+    """
+
+    def __init__(self, numeric_cols, non_numeric_cols, key_cols=(), counter_factory=Counter, stats_factory=RunningStats, id_table=None,
+                 text_cols=(), text_factory=TextProfile):
+        self.numeric_cols = list(numeric_cols)
+        self.non_numeric_cols = list(non_numeric_cols)
+        self.text_cols = [] if key_cols else list(text_cols)
+        self.key_cols = tuple(key_cols)
+        self.id_table = _SHARED_IDS if id_table is None else id_table
+        self.exact_counts = counter_factory is Counter
+        self.stats_factory = stats_factory
+        self.numeric = defaultdict(stats_factory)
+        self.non_numeric = defaultdict(counter_factory)
+        self.text = {col: text_factory() for col in self.text_cols}
+        self.grouped_sums = {}
+
+    def bind(self, header):
+        """Resolve the key/numeric/non-numeric columns to positions in ``header``
+        once, so add_fields can take csv.reader lists and never touch the rest.
+
+        A repeated column name reads its last occurrence and a missing one reads
+        as None, as with csv.DictReader rows.
+        """
+        pos = {col: i for i, col in enumerate(header)}
+        self._width = len(header)
+        self._key_pos = [pos.get(col) for col in self.key_cols]
+        self._numeric_pos = [(col, pos[col]) for col in self.numeric_cols if col in pos]
+        self._non_numeric_pos = [(col, pos[col]) for col in self.non_numeric_cols if col in pos]
+        self._text_pos = [(self.text[col], pos.get(col)) for col in self.text_cols]
+        return self
+
+    def add_fields(self, fields):
+        # Fold in one csv.reader row (a list of fields laid out like the header passed to bind()); short rows read as None past their end
+        if len(fields) < self._width:
+            fields = list(fields) + [None] * (self._width - len(fields))
+        sums = None
+        if self.key_cols:
+            ids = self.id_table.codes
+            key = 0
+            for i in self._key_pos:
+                val = None if i is None else fields[i]
+                code = ids.get(val)
+                if code is None:
+                    code = self.id_table.code(val)
+                key = key << KEY_BITS | code
+            sums = self.grouped_sums.get(key)
+            if sums is None:
+                sums = self.grouped_sums[key] = {}
+        for col, i in self._numeric_pos:
+            val = fields[i]
+            if not val:
+                continue
+            val = try_parse_float(val)
+            if val is None:
+                continue
+            if sums is None:
+                self.numeric[col].update(val)
+            else:
+                total = sums.get(col)
+                if total is None:
+                    sums[col] = [val, 1]
+                else:
+                    total[0] += val
+                    total[1] += 1
+        for col, i in self._non_numeric_pos:
+            val = fields[i]
+            if val:
+                val = val.strip()
+                if val:
+                    if self.exact_counts:
+                        self.non_numeric[col][val] += 1
+                    else:
+                        self.non_numeric[col].add(val)
+        for profile, i in self._text_pos:
+            profile.add(None if i is None else fields[i])
+
+    def merge(self, other):
+        for col, acc in other.numeric.items():
+            self.numeric[col].merge(acc)
+        for col, counter in other.non_numeric.items():
+            self.non_numeric[col].update(counter)
+        for col, profile in other.text.items():
+            if col in self.text:
+                self.text[col].merge(profile)
+            else:
+                self.text[col] = profile
+        recode = None
+        if other.grouped_sums and other.id_table is not self.id_table:
+            recode = [self.id_table.code(val) for val in other.id_table.strings]
+        for key, sums in other.grouped_sums.items():
+            if recode is not None:
+                key = self._pack(recode[code] for code in other._unpack(key))
+            mine = self.grouped_sums.get(key)
+            if mine is None:
+                self.grouped_sums[key] = {col: list(total) for col, total in sums.items()}
+                continue
+            for col, (total, count) in sums.items():
+                pair = mine.get(col)
+                if pair is None:
+                    mine[col] = [total, count]
+                else:
+                    pair[0] += total
+                    pair[1] += count
+        return self
+
+    def _unpack(self, key):
+        codes = []
+        for _ in self.key_cols:
+            codes.append(key & _KEY_MASK)
+            key >>= KEY_BITS
+        return codes[::-1]
+
+    @staticmethod
+    def _pack(codes):
+        key = 0
+        for code in codes:
+            key = key << KEY_BITS | code
+        return key
+
+    def group_means(self):
+        means = defaultdict(self.stats_factory)
+        for sums in self.grouped_sums.values():
+            for col, (total, count) in sums.items():
+                means[col].update(total / count)
+        return means
@@ -0,0 +1,242 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from cli import BACKENDS, DATASETS
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# === Configuration ===
+DEFAULT_ROWS = (1_000, 10_000, 100_000)  # up to 1e8 works; generated files are kept under --data-dir
+DEFAULT_THRESHOLD = 0.25  # fail when wall time or peak RSS grows by more than this share over the baseline
+DATA_DIR = os.path.join(tempfile.gettempdir(), "descriptive_stats_bench")
+
+REGIONS = ["Texas", "Ohio", "Iowa", "Utah", "Florida", "Georgia", "Arizona", "Nevada", "Michigan", "Pennsylvania"]
+AGE_RANGES = ["13-17", "18-24", "25-34", "35-44", "45-54", "55-64", "65+"]
+GENDERS = ["male", "female", "unknown"]
+PLATFORMS = ["facebook", "instagram", "messenger", "audience_network"]
+MENTIONS = ["@JoeBiden", "@KamalaHarris", "@realDonaldTrump", "@JDVance", "@TimWalz"]
+WORDS = ["vote", "election", "america", "economy", "border", "freedom", "rally", "debate", "jobs", "tax",
+         "president", "campaign", "today", "tonight", "people", "great", "must", "never", "join", "fight"]
+MSG_TYPES = ["advocacy", "attack", "call_to_action", "ceremonial", "image", "issue", "cta"]
+
+# === Synthetic Data ===
+def _hex_id(rng):
+    return f"{rng.getrandbits(256):064x}"
+
+def _text(rng):
+    words = rng.choices(WORDS, k=rng.randint(3, 30))
+    if rng.random() < 0.1:
+        words.insert(rng.randrange(len(words)), '"quoted,"')
+    if rng.random() < 0.05:
+        words.append("\nsecond line")  # multi-line quoted field, as in the real exports
+    return " ".join(words)
+
+def _date(rng):
+    return f"2024-{rng.randint(1, 11):02d}-{rng.randint(1, 28):02d}"
+
+def _illuminating(rng):
+    return [rng.choice(["0", "1"]) for _ in MSG_TYPES]
+
+def _fb_ads(rng, rows, out_dir):
+    pages = [_hex_id(rng) for _ in range(max(10, rows // 50))]
+    bylines = [f"{rng.choice(WORDS).title()} PAC" for _ in range(max(5, rows // 200))] + [""]
+    names = ["main_ads_cleaned.csv", "unpacked_demographics.csv", "unpacked_platforms.csv",
+             "unpacked_mentions.csv", "unpacked_delivery_by_region.csv"]
+    counts = dict.fromkeys(names, 0)
+    handles = [open(os.path.join(out_dir, name), "w", newline="", encoding="utf-8") for name in names]
+    try:
+        main, demo, plat, mention, region = (csv.writer(f) for f in handles)
+        main.writerow(["page_id", "ad_id", "ad_creation_time", "bylines", "currency", "estimated_audience_size",
+                       "estimated_impressions", "estimated_spend"] + [f"{t}_msg_type_illuminating" for t in MSG_TYPES]
+                      + ["scam_illuminating", "election_integrity_Truth_illuminating"])
+        demo.writerow(["ad_id", "page_id", "gender", "age_range", "demo_spend", "demo_impressions"])
+        plat.writerow(["ad_id", "page_id", "platform"])
+        mention.writerow(["ad_id", "page_id", "mention"])
+        region.writerow(["ad_id", "page_id", "region", "region_spend", "region_impressions"])
+        for _ in range(rows):
+            page_id, ad_id = rng.choice(pages), _hex_id(rng)
+            spend = rng.randint(0, 100_000)
+            main.writerow([page_id, ad_id, _date(rng), rng.choice(bylines), "USD", rng.randint(1_000, 1_000_000),
+                           rng.randint(0, 500_000), spend] + _illuminating(rng) + [rng.choice(["0", "1"]), rng.choice(["0", "1", ""])])
+            for gender in rng.sample(GENDERS, rng.randint(1, 3)):
+                for age in rng.sample(AGE_RANGES, rng.randint(1, 4)):
+                    demo.writerow([ad_id, page_id, gender, age, round(rng.random(), 6), round(rng.random(), 6)])
+                    counts["unpacked_demographics.csv"] += 1
+            for name in rng.sample(PLATFORMS, rng.randint(1, 3)):
+                plat.writerow([ad_id, page_id, name])
+                counts["unpacked_platforms.csv"] += 1
+            for name in rng.sample(MENTIONS, rng.randint(0, 2)):
+                mention.writerow([ad_id, page_id, name])
+                counts["unpacked_mentions.csv"] += 1
+            for name in rng.sample(REGIONS, rng.randint(1, 5)):
+                region.writerow([ad_id, page_id, name, round(rng.random(), 6), round(rng.random(), 6)])
+                counts["unpacked_delivery_by_region.csv"] += 1
+        counts["main_ads_cleaned.csv"] = rows
+    finally:
+        for f in handles:
+            f.close()
+    return counts
+
+def _fb_posts(rng, rows, out_dir):
+    name = DATASETS["fb-posts"][1][0]
+    accounts = [_hex_id(rng) for _ in range(max(10, rows // 100))]
+    with open(os.path.join(out_dir, name), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Facebook_Id", "post_id", "Page Category", "Page Admin Top Country", "Post Created", "Type",
+                         "Total Interactions", "Likes", "Comments", "Shares", "Love", "Angry", "Message"]
+                        + [f"{t}_msg_type_illuminating" for t in MSG_TYPES] + ["incivility_illuminating"])
+        for _ in range(rows):
+            likes, comments, shares = rng.randint(0, 50_000), rng.randint(0, 5_000), rng.randint(0, 5_000)
+            love, angry = rng.randint(0, 2_000), rng.randint(0, 2_000)
+            writer.writerow([rng.choice(accounts), _hex_id(rng), rng.choice(["POLITICIAN", "POLITICAL_CANDIDATE", "NEWS_SITE", ""]),
+                             rng.choice(["US", "US", "US", "CA", ""]), f"{_date(rng)} 12:00:00 EDT", rng.choice(["Photo", "Link", "Video", "Status"]),
+                             likes + comments + shares + love + angry, likes, comments, shares, love, angry, _text(rng)]
+                            + _illuminating(rng) + [rng.choice(["0", "1"])])
+    return {name: rows}
+
+def _tw_posts(rng, rows, out_dir):
+    name = DATASETS["tw-posts"][1][0]
+    with open(os.path.join(out_dir, name), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "url", "source", "text", "retweetCount", "replyCount", "likeCount", "quoteCount",
+                         "viewCount", "createdAt", "lang", "isReply", "isQuote", "bookmarkCount"]
+                        + [f"{t}_msg_type_illuminating" for t in MSG_TYPES])
+        for _ in range(rows):
+            tweet_id = rng.randint(10 ** 18, 10 ** 19 - 1)
+            writer.writerow([tweet_id, f"https://x.com/i/status/{tweet_id}", rng.choice(["Twitter for iPhone", "Twitter Web App", "Twitter for Android"]),
+                             _text(rng), rng.randint(0, 50_000), rng.randint(0, 10_000), rng.randint(0, 200_000), rng.randint(0, 5_000),
+                             rng.randint(0, 10_000_000), f"{_date(rng)}T18:30:00.000Z", rng.choice(["en", "en", "es", "und"]),
+                             rng.choice(["True", "False"]), rng.choice(["True", "False"]), rng.randint(0, 1_000)]
+                            + _illuminating(rng))
+    return {name: rows}
+
+GENERATORS = {"fb-ads": _fb_ads, "fb-posts": _fb_posts, "tw-posts": _tw_posts}
+
+def ensure_dataset(dataset, rows, data_dir=DATA_DIR, seed=0):
+    """Generate (once) a seeded synthetic copy of ``dataset`` and return (folder, {file name: row count})."""
+    folder = os.path.join(data_dir, f"{dataset}-{rows}-seed{seed}")
+    manifest = os.path.join(folder, "manifest.json")
+    if os.path.exists(manifest):
+        with open(manifest, encoding="utf-8") as f:
+            return folder, json.load(f)
+    tmp = folder + ".tmp"
+    os.makedirs(tmp, exist_ok=True)
+    counts = GENERATORS[dataset](random.Random(f"{dataset}|{rows}|{seed}"), rows, tmp)
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(counts, f, indent=2)
+    os.replace(tmp, folder)
+    return folder, counts
+
+# === Measurement ===
+def measure(cmd):
+    """Run ``cmd`` once; return (wall seconds, peak RSS bytes or None, exit code, stderr tail)."""
+    with tempfile.TemporaryFile() as err:
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=err)
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(proc.pid, 0)
+            wall = time.perf_counter() - start
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            # ru_maxrss is in KiB on Linux and in bytes on macOS
+            peak_rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+        else:
+            proc.wait()
+            wall = time.perf_counter() - start
+            peak_rss = None  # no per-child rusage on Windows
+        err.seek(0)
+        stderr = err.read().decode("utf-8", "replace")[-2000:]
+    return wall, peak_rss, proc.returncode, stderr
+
+def run_benchmarks(rows_list, datasets, backends, parts=None, data_dir=DATA_DIR, seed=0, repeat=1):
+    results = []
+    for rows in rows_list:
+        for dataset in datasets:
+            folder, counts = ensure_dataset(dataset, rows, data_dir, seed)
+            for backend in backends:
+                for part in parts or DATASETS[dataset][2]:
+                    if part not in DATASETS[dataset][2]:
+                        continue
+                    for file_name, file_rows in counts.items():
+                        cmd = [sys.executable, CODE_DIR, dataset, os.path.join(folder, file_name),
+                               "--backend", backend, "--parts", str(part), "--row-limit", "all"]
+                        runs = [measure(cmd) for _ in range(repeat)]
+                        wall, peak_rss, code, stderr = min(runs, key=lambda run: run[0])
+                        result = {
+                            "dataset": dataset, "backend": backend, "part": part, "file": file_name, "rows": file_rows,
+                            "wall_s": round(wall, 4), "rows_per_s": round(file_rows / wall, 1) if wall else None,
+                            "peak_rss_bytes": peak_rss, "exit_code": code,
+                        }
+                        if code:
+                            result["stderr"] = stderr
+                        results.append(result)
+                        print(f"  {dataset:8} {backend:6} part {part} {file_name:42} {file_rows:>11,} rows "
+                              f"{wall:8.3f}s {result['rows_per_s'] or 0:>12,.0f} rows/s "
+                              f"{(peak_rss or 0) / 2 ** 20:8.1f} MiB{'  FAILED' if code else ''}", flush=True)
+    return results
+
+# === Regression Check ===
+def _key(result):
+    return result["dataset"], result["backend"], result["part"], result["file"], result["rows"]
+
+def find_regressions(results, baseline, threshold=DEFAULT_THRESHOLD):
+    old = {_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = old.get(_key(result))
+        if before is None:
+            continue
+        for metric in ("wall_s", "peak_rss_bytes"):
+            if result[metric] and before[metric] and result[metric] > before[metric] * (1 + threshold):
+                regressions.append((result, metric, before[metric], result[metric]))
+    return regressions
+
+# === Entry Point ===
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pure / pandas / Polars stats scripts on synthetic data.")
+    parser.add_argument("--rows", type=lambda text: int(float(text)), nargs="+", default=DEFAULT_ROWS,
+                        help="rows per generated dataset, e.g. 1e3 1e6 (fb ads: ads in main_ads_cleaned.csv)")
+    parser.add_argument("--datasets", nargs="+", choices=DATASETS, default=list(DATASETS))
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--parts", type=int, nargs="+", choices=(1, 2, 3))
+    parser.add_argument("--repeat", type=int, default=1, help="runs per measurement; the fastest is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="earlier --output file to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.rows, args.datasets, args.backends, args.parts, args.data_dir, args.seed, args.repeat)
+    report = {
+        "meta": {"python": sys.version.split()[0], "platform": platform.platform(), "cpus": os.cpu_count(),
+                 "seed": args.seed, "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results written to {args.output}")
+
+    failed = [result for result in results if result["exit_code"]]
+    for result in failed:
+        print(f"  ⚠️ {result['dataset']} {result['backend']} part {result['part']} {result['file']} exited with {result['exit_code']}")
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = find_regressions(results, json.load(f), args.threshold)
+        for result, metric, before, after in regressions:
+            print(f"  ❌ {result['dataset']} {result['backend']} part {result['part']} {result['file']} ({result['rows']:,} rows): "
+                  f"{metric} {before} -> {after} (+{(after / before - 1) * 100:.0f}%)")
+        if not regressions:
+            print(f"  ✅ No regressions above {args.threshold:.0%} against {args.baseline}")
+    return 1 if failed or regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+import hashlib
+import os
+import pickle
+
+from accumulators import PartialStats, StringTable
+from parallel_scan import CHUNK_BYTES, complete_rows_end, ranges_between, row_aligned_ranges, scan_ranges
+
+STATE_VERSION = 3  # 2: grouped_sums keyed by interned id codes, 3: PartialStats.text profiles
+_TAIL_BYTES = 64 * 1024  # bytes before the checkpoint that must be unchanged for an append-only resume
+
+# === State Files ===
+def _digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+def state_file(state_dir, path, groupings):
+    key = f"{os.path.abspath(path)}|{sorted(groupings.items())}".encode('utf-8')
+    return os.path.join(state_dir, f"{os.path.basename(path)}-{_digest(key)[:16]}.state")
+
+def load_state(state_path):
+    try:
+        with open(state_path, 'rb') as f:
+            state = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+    return state if isinstance(state, dict) and state.get('version') == STATE_VERSION else None
+
+def save_state(state_path, state):
+    os.makedirs(os.path.dirname(state_path) or '.', exist_ok=True)
+    tmp = state_path + ".tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, state_path)
+
+def _read_digest(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return _digest(f.read(end - start))
+
+def _tail_digest(path, offset):
+    return _read_digest(path, max(0, offset - _TAIL_BYTES), offset)
+
+# === Incremental Scan ===
+def incremental_scan(path, state_dir, numeric_cols, non_numeric_cols, groupings, workers=1, **partial_kwargs):
+    """Like parallel_scan, but only parses rows appended since the last call.
+
+    The merged PartialStats are pickled to ``state_dir`` with the byte offset
+    they cover, a header fingerprint and a fingerprint of the bytes just before
+    the offset. The next call resumes from that offset and merges in the new
+    rows. A changed header, a truncated or rewritten file, different column
+    types or different accumulator settings start over from row zero.
+    """
+    header, ranges = row_aligned_ranges(path, 1)
+    header_end = ranges[0][0] if ranges else os.path.getsize(path)
+    header_digest = _read_digest(path, 0, header_end)
+    settings = repr((sorted(numeric_cols), sorted(non_numeric_cols), sorted(partial_kwargs.items())))
+    state_path = state_file(state_dir, path, groupings)
+
+    state = load_state(state_path)
+    resume = (state is not None and state['header'] == header_digest and state['settings'] == settings
+              and state['offset'] <= os.path.getsize(path) and state['tail'] == _tail_digest(path, state['offset']))
+    if resume:
+        partials, offset = state['partials'], state['offset']
+        numeric_cols, non_numeric_cols = state['columns']  # keep the column order of the first run
+    else:
+        ids = StringTable()
+        partials = {name: PartialStats(numeric_cols, non_numeric_cols, key_cols, id_table=ids, **partial_kwargs) for name, key_cols in groupings.items()}
+        offset = header_end
+
+    end = complete_rows_end(path, offset)
+    if end > offset:
+        n_chunks = max(workers, (end - offset) // CHUNK_BYTES + 1)
+        new_rows = scan_ranges(path, header, ranges_between(path, offset, end, n_chunks),
+                               numeric_cols, non_numeric_cols, groupings, workers, **partial_kwargs)
+        for name, partial in new_rows.items():
+            partials[name].merge(partial)
+    if end > offset or not resume:
+        save_state(state_path, {
+            'version': STATE_VERSION, 'header': header_digest, 'settings': settings,
+            'offset': end, 'tail': _tail_digest(path, end),
+            'columns': (numeric_cols, non_numeric_cols), 'partials': partials,
+        })
+    return partials
@@ -0,0 +1,135 @@
+from collections import Counter
+from functools import partial as bind
+
+import pandas as pd
+
+from accumulators import RunningStats
+
+COLLAPSE_EVERY = 16  # per-chunk group tables held before they are summed into one
+
+# === Reading ===
+def read_chunks(path, chunk_rows, row_limit=None, usecols=None):
+    """(numeric columns, text columns, chunk iterator) for ``read_csv(chunksize=chunk_rows)``.
+
+    Column types are settled on the first chunk: later chunks read the text
+    columns as str and coerce the numeric ones, so no chunk can flip a column's
+    type halfway through the file.
+    """
+    head_rows = chunk_rows if row_limit is None else min(chunk_rows, row_limit)
+    head = pd.read_csv(path, nrows=head_rows, usecols=usecols)
+    numeric_cols = head.select_dtypes(include='number').columns.tolist()
+    text_cols = head.select_dtypes(exclude='number').columns.tolist()
+    reader = pd.read_csv(path, nrows=row_limit, usecols=usecols, chunksize=chunk_rows, dtype={col: str for col in text_cols})
+
+    def chunks():
+        with reader:
+            for chunk in reader:
+                for col in numeric_cols:
+                    if not pd.api.types.is_numeric_dtype(chunk[col]):
+                        chunk[col] = pd.to_numeric(chunk[col], errors='coerce')
+                yield chunk
+    return numeric_cols, text_cols, chunks()
+
+# === Folding ===
+def fold_moments(df, stats):
+    # Each column's count/mean/variance/min/max merged into stats[col]
+    counts, means, variances, mins, maxs = df.count(), df.mean(), df.var(ddof=0), df.min(), df.max()
+    for col in df.columns:
+        n = int(counts[col])
+        if n:
+            acc = stats[col]
+            acc.merge(RunningStats.from_moments(n, float(means[col]), float(variances[col]) * n, float(mins[col]), float(maxs[col])))
+            if acc.sketch is not None:
+                acc.sketch.update_many(df[col].dropna().tolist())
+
+def fold_counts(df, counters):
+    for col in df.columns:
+        # sort=False keeps first-appearance order, so ties resolve as they would on the whole column
+        counters[col].update(df[col].value_counts(sort=False).to_dict())
+
+def _collapse(tables, n_keys):
+    return pd.concat(tables).groupby(level=list(range(n_keys))).sum()
+
+# === Scan ===
+def scan_chunks(path, groupings, chunk_rows, row_limit=None, usecols=None, quantile_k=None):
+    """One chunked pass over ``path`` feeding every ``groupings`` entry (part -> key columns).
+
+    Each part ends up as ``{'numeric': {col: RunningStats}, 'non_numeric':
+    {col: Counter}, 'columns': [...]}``. Ungrouped parts fold each chunk's
+    column moments and value counts; grouped ones keep per-group sums/counts
+    (the numeric stats are then over the group means) and count the text of
+    rows with every key set. Memory is one chunk plus the groups, whatever the
+    file size. A part whose key columns are missing is None.
+    """
+    numeric_cols, text_cols, chunks = read_chunks(path, chunk_rows, row_limit, usecols)
+    columns = numeric_cols + text_cols
+    stats_factory = bind(RunningStats, quantile_k) if quantile_k else RunningStats
+    states, sums = {}, {}
+    for name, key_cols in groupings.items():
+        if all(col in columns for col in key_cols):
+            states[name] = {'numeric': {col: stats_factory() for col in numeric_cols},
+                            'non_numeric': {col: Counter() for col in text_cols}, 'columns': columns}
+            sums[name] = []
+        else:
+            states[name] = None
+
+    rows = 0
+    for chunk in chunks:
+        rows += len(chunk)
+        for name, key_cols in groupings.items():
+            state = states[name]
+            if state is None:
+                continue
+            if not key_cols:
+                fold_moments(chunk[numeric_cols], state['numeric'])
+                fold_counts(chunk[text_cols], state['non_numeric'])
+                continue
+            key_cols = list(key_cols)
+            if numeric_cols:
+                sums[name].append(chunk.groupby(key_cols)[numeric_cols].agg(['sum', 'count']))
+                if len(sums[name]) >= COLLAPSE_EVERY:
+                    sums[name] = [_collapse(sums[name], len(key_cols))]
+            keyed_rows = chunk[key_cols].notna().all(axis=1)
+            fold_counts(chunk.loc[keyed_rows, text_cols], state['non_numeric'])
+
+    for name, key_cols in groupings.items():
+        if states[name] is not None and key_cols and sums[name]:
+            totals = _collapse(sums[name], len(key_cols))
+            means = pd.DataFrame({col: totals[(col, 'sum')] / totals[(col, 'count')].where(totals[(col, 'count')] > 0)
+                                  for col in numeric_cols})
+            fold_moments(means, states[name]['numeric'])
+    return states, rows
+
+# === Output ===
+def print_moment_stats(stats, percentiles=()):
+    if not stats:
+        print("  ⚠️ No numeric columns found.")
+        return
+    nan = float('nan')
+    for col, acc in stats.items():
+        if not acc.count:
+            print(f"  📊 {col} -> count: 0, mean: {nan}, min: {nan}, max: {nan}, std: {nan}")  # all empty, as describe()
+            continue
+        std = (acc.m2 / (acc.count - 1)) ** 0.5 if acc.count > 1 else nan  # sample std, as describe()
+        quantiles = acc.sketch.quantiles(percentiles) if percentiles and acc.sketch is not None else []
+        extra = "".join(f", p{q * 100:g}: {val}" for q, val in zip(percentiles, quantiles))
+        print(f"  📊 {col} -> count: {acc.count}, mean: {acc.mean}, min: {acc.min}, max: {acc.max}, std: {std}{extra}")
+
+def print_counter_stats(counters):
+    if not counters:
+        print("  ⚠️ No non-numeric columns found.")
+        return
+    for col, counter in counters.items():
+        if not counter:
+            continue
+        top, freq = counter.most_common(1)[0]
+        print(f"  🔠 {col} -> count: {sum(counter.values())}, unique: {len(counter)}, top: {top}, freq: {freq}")
+
+def fold_into(numeric, non_numeric, acc, counter, skip=()):
+    # A chunked part's per-column results into the global accumulators
+    for col, stats in numeric.items():
+        if col not in skip:
+            acc.merge(stats)
+    for col, counts in non_numeric.items():
+        if col not in skip:
+            counter.update(counts)
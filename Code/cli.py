@@ -0,0 +1,133 @@
+import argparse
+import importlib.util
+import os
+import sys
+
+from columns import PRESETS
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# === Registry ===
+# dataset -> (script folder, default file names, parts the scripts implement)
+DATASETS = {
+    "fb-ads": ("fb ads", ["main_ads_cleaned.csv", "unpacked_demographics.csv", "unpacked_platforms.csv",
+                          "unpacked_mentions.csv", "unpacked_delivery_by_region.csv"], (1, 2, 3)),
+    "fb-posts": ("fb posts", ["2024_fb_posts_president_scored_anon.csv"], (1, 2, 3)),
+    "tw-posts": ("tw posts", ["2024_tw_posts_president_scored_anon.csv"], (1,)),
+}
+BACKENDS = {"pure": "pure_python_stats.py", "pandas": "pandas_stats.py", "polars": "polars_stats.py"}
+
+# === Helpers ===
+def load_backend(dataset, backend):
+    # Import only the chosen script, so pandas/Polars are never loaded for --backend pure
+    folder = DATASETS[dataset][0]
+    path = os.path.join(CODE_DIR, folder, BACKENDS[backend])
+    spec = importlib.util.spec_from_file_location(f"{folder.replace(' ', '_')}_{backend}_stats", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module  # lets process pools pickle the script's functions
+    spec.loader.exec_module(module)
+    return module
+
+def resolve_files(dataset, paths):
+    # A directory stands for the dataset's usual file names inside it
+    names = DATASETS[dataset][1]
+    files = {}
+    for path in paths:
+        if os.path.isdir(path):
+            files.update((name, os.path.join(path, name)) for name in names)
+        else:
+            files[os.path.basename(path)] = path
+    return files or None
+
+def row_limit(text):
+    return None if text.lower() in ("none", "all") else int(text)
+
+def column_spec(args):
+    # --columns preset, then --include/--exclude/--pattern on top of it; None keeps the script's COLUMNS
+    spec = dict(PRESETS[args.columns]) if args.columns else {}
+    if args.include:
+        spec["include"] = args.include
+    if args.exclude:
+        spec["exclude"] = [*spec.get("exclude", ()), *args.exclude]
+    if args.pattern:
+        spec["pattern"] = args.pattern
+    return spec or None
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python Code", description="Descriptive statistics for the 2024 election datasets.")
+    parser.add_argument("dataset", choices=DATASETS)
+    parser.add_argument("paths", nargs="*", help="input CSVs, or a folder holding the dataset's usual file names "
+                                                 "(default: the paths configured in the script)")
+    parser.add_argument("--backend", choices=BACKENDS, default="pure")
+    parser.add_argument("--parts", type=int, nargs="+", choices=(1, 2, 3), help="default: every part the dataset has")
+    parser.add_argument("--row-limit", type=row_limit, default=argparse.SUPPRESS,
+                        help="rows read per file; 'all' reads everything (default: the script's ROW_LIMIT)")
+    parser.add_argument("--sample", choices=("reservoir", "stratified"),
+                        help="pure backend: analyse a uniform sample of the whole file instead of its first rows, "
+                             "with confidence intervals on the means (post-stratified by page when stratified)")
+    parser.add_argument("--sample-rows", type=int, metavar="N", help="total sample size (default: the script's SAMPLE_ROWS)")
+    parser.add_argument("--chunk-rows", type=int, metavar="N", help="pandas backend: read N rows at a time into mergeable stats, "
+                                                                    "so whole files run in fixed memory")
+    parser.add_argument("--text-profile", action="store_true", help="fb-posts/tw-posts, pure backend: profile free-text columns "
+                                                                    "(length, empty rate, top terms) instead of counting their values")
+    parser.add_argument("--columns", metavar="PRESET", choices=PRESETS,
+                        help=f"read only a preset's columns ({', '.join(PRESETS)}); other columns are never parsed")
+    parser.add_argument("--include", nargs="+", metavar="COL", help="read only these columns (plus group keys)")
+    parser.add_argument("--exclude", nargs="+", metavar="COL", help="skip these columns")
+    parser.add_argument("--pattern", metavar="REGEX", help="read only columns matching REGEX (or listed in --include)")
+    parser.add_argument("--join", action="store_true", help="fb-ads only: also print stats of the unpacked tables "
+                                                            "hash-joined to main_ads_cleaned.csv on ad_id")
+    parser.add_argument("--profile", metavar="PATH", help="record per-file/part/phase timings, throughput and peak memory "
+                                                          "to PATH: a Chrome trace, or JSON lines if PATH ends in .jsonl")
+    parser.add_argument("--trace-memory", action="store_true", help="with --profile, add tracemalloc peaks (slower)")
+    return parser
+
+# === Entry Point ===
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    supported = DATASETS[args.dataset][2]
+    parts = tuple(args.parts or supported)
+    if not set(parts) <= set(supported):
+        parser.error(f"{args.dataset} only has part(s) {', '.join(map(str, supported))}")
+    if args.join and args.dataset != "fb-ads":
+        parser.error("--join only applies to fb-ads")
+    if (args.sample or args.sample_rows) and args.backend != "pure":
+        parser.error("--sample/--sample-rows need --backend pure")
+    if args.chunk_rows and args.backend != "pandas":
+        parser.error("--chunk-rows needs --backend pandas")
+    if args.text_profile and (args.dataset not in ("fb-posts", "tw-posts") or args.backend != "pure"):
+        parser.error("--text-profile applies to fb-posts/tw-posts with --backend pure")
+    files = resolve_files(args.dataset, args.paths)
+    if files:
+        missing = [path for path in files.values() if not os.path.exists(path)]
+        if missing:
+            parser.error(f"no such file: {', '.join(missing)}")
+
+    sys.path.insert(0, CODE_DIR)
+    import profiling
+    if args.profile:
+        profiling.enable(args.profile, args.trace_memory)
+    with profiling.span("run", dataset=args.dataset, backend=args.backend):
+        with profiling.span("import", backend=args.backend):
+            module = load_backend(args.dataset, args.backend)
+        if hasattr(args, "row_limit"):
+            module.ROW_LIMIT = args.row_limit
+        if args.join:
+            module.JOIN_STATS = True
+        if args.chunk_rows:
+            module.CHUNK_ROWS = args.chunk_rows
+        if args.sample:
+            module.SAMPLING = args.sample
+        if args.sample_rows:
+            module.SAMPLE_ROWS = args.sample_rows
+        if args.text_profile:
+            module.TEXT_PROFILE = True
+        spec = column_spec(args)
+        if spec is not None:
+            module.COLUMNS = spec
+        module.main(parts, files)
+    profiling.write()
+
+if __name__ == "__main__":
+    main()
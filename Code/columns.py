@@ -0,0 +1,58 @@
+import csv
+import re
+
+# === Presets ===
+# Per-dataset selections that leave out the free-text, link and still-packed columns
+PRESETS = {
+    "fb-ads": {"exclude": ["bylines", "ad_creation_time", "delivery_by_region", "demographic_distribution",
+                           "publisher_platforms", "illuminating_mentions"]},
+    "fb-posts": {"exclude": ["Message", "Description", "Link", "Final Link", "Link Text", "Image Text", "URL"]},
+    "tw-posts": {"exclude": ["text", "url"]},
+}
+SPEC_KEYS = ("include", "exclude", "pattern", "exclude_pattern")
+
+# === Specs ===
+def resolve_spec(spec):
+    """A COLUMNS setting as a spec dict: None (every column), a PRESETS name, or a dict with any of
+    ``include`` / ``exclude`` (column names) and ``pattern`` / ``exclude_pattern`` (regexes, re.search)."""
+    if spec is None or isinstance(spec, dict):
+        unknown = set(spec or ()) - set(SPEC_KEYS)
+        if unknown:
+            raise ValueError(f"unknown column spec key(s): {', '.join(sorted(unknown))}")
+        return spec
+    if spec not in PRESETS:
+        raise ValueError(f"unknown column preset {spec!r} (presets: {', '.join(PRESETS)})")
+    return PRESETS[spec]
+
+def column_filter(spec, keep=()):
+    """Predicate telling whether a column is read, or None when every column is.
+
+    A column is read when it is listed in ``include`` or matches ``pattern``
+    (either one; with neither set, every column qualifies) and is neither in
+    ``exclude`` nor matches ``exclude_pattern``. ``keep`` (group keys) is
+    always read.
+    """
+    spec = resolve_spec(spec)
+    if not spec:
+        return None
+    include = set(spec.get("include") or ())
+    exclude = set(spec.get("exclude") or ())
+    pattern = re.compile(spec["pattern"]) if spec.get("pattern") else None
+    exclude_pattern = re.compile(spec["exclude_pattern"]) if spec.get("exclude_pattern") else None
+    keep = set(keep)
+
+    def wanted(col):
+        if col in keep:
+            return True
+        if (include or pattern) and col not in include and not (pattern and pattern.search(col)):
+            return False
+        return col not in exclude and not (exclude_pattern and exclude_pattern.search(col))
+    return wanted
+
+def select_columns(columns, spec, keep=()):
+    wanted = column_filter(spec, keep)
+    return list(columns) if wanted is None else [col for col in columns if wanted(col)]
+
+def read_header(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return next(csv.reader(f), [])
@@ -0,0 +1,144 @@
+import csv
+import hashlib
+import os
+
+from schema import load_schema, resolve_schema
+
+# === Configuration ===
+CACHE_DIR = os.environ.get("STATS_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "descriptive_stats"))
+CACHE_BUDGET_BYTES = int(os.environ.get("STATS_CACHE_BUDGET_BYTES", 10 * 1024 ** 3))
+BLOCK_SIZE = 16 * 1024 * 1024
+SCHEMA_SAMPLE_SIZE = 100  # rows sampled for the <file>.schema.json sidecar when no earlier run left one
+
+# === Cache Keys ===
+def _digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+def cache_entry_prefix(path):
+    return f"{os.path.basename(path)}-{_digest(os.path.abspath(path))}-"
+
+def cache_entry_name(path):
+    st = os.stat(path)
+    return f"{cache_entry_prefix(path)}{_digest(f'{st.st_size}|{st.st_mtime_ns}')}.arrow"
+
+# === Conversion ===
+def _csv_options(column_types=None):
+    import pyarrow.csv as pacsv
+    return dict(
+        read_options=pacsv.ReadOptions(block_size=BLOCK_SIZE),
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(column_types=column_types, strings_can_be_null=True),
+    )
+
+def _detected_schema(path):
+    # The sidecar the pure scripts use (inferred and saved here if none exists yet)
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        rows = csv.reader(f)
+        header = next(rows, None)
+        if header is None:
+            return None
+        return load_schema(path, header) or resolve_schema(path, header, rows, SCHEMA_SAMPLE_SIZE)[0]
+
+def _column_types(path, widen_ints=False):
+    # Column types come from the detected schema: non-numeric columns are read
+    # as strings (dates included, as pandas/Polars do) and numeric ones that are
+    # empty in the first block as floats. The rest is left to pyarrow's
+    # first-block inference; ints that later turn fractional get the widened retry.
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    try:
+        detected = _detected_schema(path)
+    except (OSError, UnicodeDecodeError, csv.Error):
+        detected = None
+    kinds = detected["columns"] if detected else {}
+    schema = pacsv.open_csv(path, **_csv_options()).schema
+    column_types = {}
+    for field in schema:
+        info = kinds.get(field.name)
+        if info is not None and not info["numeric"]:
+            column_types[field.name] = pa.string()
+        elif pa.types.is_temporal(field.type):
+            column_types[field.name] = pa.string()
+        elif pa.types.is_null(field.type):
+            column_types[field.name] = pa.float64() if info is not None else pa.string()
+        elif widen_ints and pa.types.is_integer(field.type):
+            column_types[field.name] = pa.float64()
+    return column_types
+
+def _convert(path, target):
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    for widen_ints in (False, True):
+        try:
+            reader = pacsv.open_csv(path, **_csv_options(_column_types(path, widen_ints)))
+            with pa.OSFile(target, 'wb') as sink, pa.ipc.new_file(sink, reader.schema) as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+            return True
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            continue
+    return False
+
+# === Eviction ===
+def evict(cache_dir, budget, keep=None):
+    entries = []
+    for name in os.listdir(cache_dir):
+        full = os.path.join(cache_dir, name)
+        if name.endswith(".arrow") and full != keep:
+            st = os.stat(full)
+            entries.append((st.st_mtime, st.st_size, full))
+    total = sum(size for _, size, _ in entries) + (os.path.getsize(keep) if keep else 0)
+    for _, size, full in sorted(entries):
+        if total <= budget:
+            break
+        os.remove(full)
+        total -= size
+
+# === Public API ===
+def cached_ipc_path(path, cache_dir=None, budget=None, convert=True):
+    """Return an Arrow IPC copy of ``path``, converting it on first use.
+
+    Entries are keyed by path + size + mtime, touched on every hit and evicted
+    least-recently-used first once the cache exceeds ``budget`` bytes. With
+    ``convert=False`` (row-limited previews) only an existing entry is
+    returned, and a miss gives None rather than converting the whole CSV.
+    Returns None when pyarrow is missing or the CSV cannot be converted, so
+    callers can fall back to parsing the CSV.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    cache_dir = cache_dir or CACHE_DIR
+    budget = CACHE_BUDGET_BYTES if budget is None else budget
+    target = os.path.join(cache_dir, cache_entry_name(path))
+    if os.path.exists(target):
+        os.utime(target)
+        return target
+    if not convert:
+        return None
+
+    os.makedirs(cache_dir, exist_ok=True)
+    prefix = cache_entry_prefix(path)
+    for name in os.listdir(cache_dir):
+        if name.startswith(prefix):
+            os.remove(os.path.join(cache_dir, name))  # stale copy of an older version of this file
+    tmp = target + ".tmp"
+    try:
+        if not _convert(path, tmp):
+            return None
+        os.replace(tmp, target)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    evict(cache_dir, budget, keep=target)
+    return target
+
+def read_cached_table(ipc_path, row_limit=None, columns=None):
+    import pyarrow as pa
+    # Memory-mapped IPC: the table's buffers point straight into the file. Keep them there
+    # with to_pandas(types_mapper=pd.ArrowDtype); a plain to_pandas() copies them out.
+    table = pa.ipc.open_file(pa.memory_map(ipc_path)).read_all()
+    if columns is not None:
+        table = table.select(columns)
+    return table if row_limit is None else table.slice(0, row_limit)
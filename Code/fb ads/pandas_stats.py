@@ -1,6 +1,17 @@
+import os
+import sys
 import pandas as pd
 from collections import Counter
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from accumulators import RunningStats
+from chunked_scan import fold_into, print_counter_stats, print_moment_stats, scan_chunks
+from columns import read_header, select_columns
+from csv_cache import cached_ipc_path, read_cached_table
+from hash_join import JOIN_KEY, main_columns, print_join
+from profiling import span
+from scheduler import capture_output, memory_estimate, run_files
+
 # === Configuration ===
 csv_files = {
     "main_ads_cleaned.csv": r"C:\Users\puroh\OneDrive\Documents\Syracuse\RA\Task_03_Descriptive_Stats\Unpacked Data\fb ads\main_ads_cleaned.csv",
@@ -10,6 +21,24 @@ csv_files = {
     "unpacked_delivery_by_region.csv": r"C:\Users\puroh\OneDrive\Documents\Syracuse\RA\Task_03_Descriptive_Stats\Unpacked Data\fb ads\unpacked_delivery_by_region.csv",
 }
 ROW_LIMIT = 500
+COLUMNS = None  # columns to read: None for all, a columns.PRESETS name (e.g. "fb-ads") or {"include": [...], "exclude": [...], "pattern": regex, "exclude_pattern": regex}
+CHUNK_ROWS = None  # e.g. 200_000: read_csv in chunks of this many rows folded into mergeable stats, so whole files (ROW_LIMIT = None) run in fixed memory; percentiles become KLL estimates
+USE_CACHE = False  # convert each CSV to a memory-mapped Arrow IPC cache on first read (needs pyarrow); row-limited runs only reuse an existing cache
+PERCENTILES = ()  # e.g. (0.5, 0.95): adds percentiles to the numeric stats
+QUANTILE_K = 200  # KLL sketch size behind the global percentiles (per-column ones stay exact)
+SINGLE_SCAN = True  # load each file once and reuse the frame for Parts 1-3
+FILE_WORKERS = 1  # >1 analyses the files concurrently in processes, largest first; output keeps the csv_files order
+MEMORY_BUDGET = None  # e.g. 4 * 2**30: only start another file while the running files' estimated memory fits
+MEMORY_PER_BYTE = 8  # rough peak memory per CSV byte read (object columns), for MEMORY_BUDGET
+PART_KEYS = {1: (), 2: ("page_id",), 3: ("page_id", "ad_id")}
+JOIN_STATS = False  # also stream each JOINS table against an ad_id index of main_ads_cleaned.csv
+JOINS = {  # name -> (unpacked table, group columns, summed measures); columns the table lacks come from main_ads_cleaned.csv
+    "spend per region per page": ("unpacked_delivery_by_region.csv", ("page_id", "region"), ("region_spend", "region_impressions")),
+    "impressions per platform per ad": ("unpacked_platforms.csv", ("platform", "ad_id"), ("estimated_impressions",)),
+    "spend per demographic": ("unpacked_demographics.csv", ("gender", "age_range"), ("demo_spend", "estimated_spend")),
+    "audience per mention": ("unpacked_mentions.csv", ("mention",), ("estimated_audience_size",)),
+}
+JOIN_CHUNK_ROWS = 100_000  # unpacked rows read, joined and grouped at a time in the join stats
 
 # === Helpers ===
 def print_numeric_stats(df):
@@ -17,8 +46,10 @@ def print_numeric_stats(df):
         print("  ⚠️ No numeric columns found.")
         return
     desc = df.describe().T
+    quantiles = df.quantile(list(PERCENTILES)) if PERCENTILES else None
     for col, row in desc.iterrows():
-        print(f"  📊 {col} -> count: {int(row['count'])}, mean: {row['mean']}, min: {row['min']}, max: {row['max']}, std: {row['std']}")
+        extra = "".join(f", p{q * 100:g}: {quantiles.at[q, col]}" for q in PERCENTILES)
+        print(f"  📊 {col} -> count: {int(row['count'])}, mean: {row['mean']}, min: {row['min']}, max: {row['max']}, std: {row['std']}{extra}")
 
 def print_non_numeric_stats(df):
     if df.empty or df.shape[1] == 0:
@@ -33,36 +64,75 @@ def print_non_numeric_stats(df):
         freq = counter.max()
         print(f"  🔠 {col} -> count: {series.count()}, unique: {series.nunique()}, top: {top_val}, freq: {freq}")
 
-def print_overall_stats(series, is_numeric):
-    series = pd.Series(series).dropna()
-    if series.empty:
+def fold_numeric(df, acc):
+    # Merge each column's count/mean/variance/min/max into acc instead of copying its values out
+    if df.shape[1] == 0:
+        return
+    counts, means, variances, mins, maxs = df.count(), df.mean(), df.var(ddof=0), df.min(), df.max()
+    for col in df.columns:
+        n = int(counts[col])
+        if n:
+            acc.merge(RunningStats.from_moments(n, float(means[col]), float(variances[col]) * n, float(mins[col]), float(maxs[col])))
+            if acc.sketch is not None:
+                acc.sketch.update_many(df[col].dropna().tolist())
+
+def fold_non_numeric(df, counter):
+    for col in df.columns:
+        # sort=False keeps first-appearance order, so ties resolve as they did on the concatenated values
+        counter.update(df[col].value_counts(sort=False).to_dict())
+
+def print_overall_stats(summary, is_numeric):
+    if (summary.count if is_numeric else len(summary)) == 0:
         print("  ⚠️ No data for global statistics.")
         return
     if is_numeric:
-        stats = series.describe()
-        print(f"  📉 Global ➡️ Overall Numeric Stats:\n  count: {int(stats['count'])}\n  mean: {stats['mean']}\n  min: {stats['min']}\n  max: {stats['max']}\n  std: {stats['std']}")
+        std = (summary.m2 / (summary.count - 1)) ** 0.5 if summary.count > 1 else float('nan')  # sample std, as describe()
+        quantiles = summary.sketch.quantiles(PERCENTILES) if PERCENTILES else []
+        extra = "".join(f"\n  p{q * 100:g}: {val}" for q, val in zip(PERCENTILES, quantiles))
+        print(f"  📉 Global ➡️ Overall Numeric Stats:\n  count: {summary.count}\n  mean: {summary.mean}\n  min: {summary.min}\n  max: {summary.max}\n  std: {std}{extra}")
     else:
-        counter = series.value_counts()
-        print(f"  📝 Global ➡️ Overall Non-Numeric Stats:\n  total entries: {series.count()}\n  unique values: {series.nunique()}\n  top: {counter.idxmax()}\n  freq: {counter.max()}")
+        top, freq = summary.most_common(1)[0]
+        print(f"  📝 Global ➡️ Overall Non-Numeric Stats:\n  total entries: {sum(summary.values())}\n  unique values: {len(summary)}\n  top: {top}\n  freq: {freq}")
+
+# === Loader ===
+def load_frame(path, parts=(1, 2, 3)):
+    with span("load", file=os.path.basename(path), chunked=bool(CHUNK_ROWS)) as sp:
+        try:
+            columns = None if COLUMNS is None else select_columns(read_header(path), COLUMNS, keep=("page_id", "ad_id"))
+            if CHUNK_ROWS:
+                # Not a frame: every part's stats, folded chunk by chunk (see process_chunked_part)
+                states, rows = scan_chunks(path, {part: PART_KEYS[part] for part in parts}, CHUNK_ROWS, ROW_LIMIT,
+                                           columns, QUANTILE_K if PERCENTILES else None)
+                sp.add(rows=rows, nbytes=os.path.getsize(path) if ROW_LIMIT is None else 0)
+                return states, None
+            cached = cached_ipc_path(path, convert=ROW_LIMIT is None) if USE_CACHE else None
+            df = read_cached_table(cached, ROW_LIMIT, columns).to_pandas(types_mapper=pd.ArrowDtype) if cached else pd.read_csv(path, nrows=ROW_LIMIT, usecols=columns)
+        except Exception as e:
+            return None, e
+        sp.add(rows=len(df), nbytes=os.path.getsize(path) if ROW_LIMIT is None else 0)
+        return df, None
 
 # === Part Processor ===
-def process_file_part(file_name, path, part):
+def process_file_part(file_name, path, part, loaded=None):
     print(f"\n==== 📂 File: {file_name} | Part {part} ====")
-    try:
-        df = pd.read_csv(path, nrows=ROW_LIMIT)
-    except Exception as e:
-        print(f"  ⚠️ Failed to load file: {e}")
-        return pd.DataFrame(), pd.DataFrame()
+    df, error = loaded if loaded is not None else load_frame(path, [part])
+    if error is not None:
+        print(f"  ⚠️ Failed to load file: {error}")
+        return ({}, {}) if CHUNK_ROWS else (pd.DataFrame(), pd.DataFrame())
+    if CHUNK_ROWS:
+        return process_chunked_part(file_name, part, df[part])
 
     numeric_cols = df.select_dtypes(include='number').columns.tolist()
     non_numeric_cols = df.select_dtypes(exclude='number').columns.tolist()
 
     if part == 1:
         print("\n-- Numeric Stats Per Column --")
-        print_numeric_stats(df[numeric_cols])
+        with span("numeric", file=file_name, part=part):
+            print_numeric_stats(df[numeric_cols])
 
         print("\n-- Non-Numeric Stats Per Column --")
-        print_non_numeric_stats(df[non_numeric_cols])
+        with span("non_numeric", file=file_name, part=part):
+            print_non_numeric_stats(df[non_numeric_cols])
 
         return df[numeric_cols], df[non_numeric_cols]
 
@@ -70,46 +140,158 @@ def process_file_part(file_name, path, part):
         if 'page_id' not in df.columns:
             print("  ⚠️ Missing 'page_id' column.")
             return pd.DataFrame(), pd.DataFrame()
-        grouped = df.groupby('page_id')
+        group_cols = ['page_id']
 
     elif part == 3:
         if 'page_id' not in df.columns or 'ad_id' not in df.columns:
             print("  ⚠️ Missing 'page_id' or 'ad_id' column.")
             return pd.DataFrame(), pd.DataFrame()
-        grouped = df.groupby(['page_id', 'ad_id'])
+        group_cols = ['page_id', 'ad_id']
 
-    numeric_agg = grouped[numeric_cols].mean() if numeric_cols else pd.DataFrame()
-    non_numeric_flat = pd.concat([group[non_numeric_cols] for _, group in grouped]) if non_numeric_cols else pd.DataFrame()
+    with span("group", file=file_name, part=part):
+        numeric_agg = df.groupby(group_cols)[numeric_cols].mean() if numeric_cols else pd.DataFrame()
+        # Stacking every group's rows is a row mask: groupby drops rows with a missing key
+        keyed_rows = df[group_cols].notna().all(axis=1)
+        non_numeric_flat = df.loc[keyed_rows, non_numeric_cols] if non_numeric_cols else pd.DataFrame()
 
     print("\n-- Numeric Stats Per Column (Grouped) --")
-    print_numeric_stats(numeric_agg)
+    with span("numeric", file=file_name, part=part):
+        print_numeric_stats(numeric_agg)
 
     print("\n-- Non-Numeric Stats Per Column (Grouped) --")
-    print_non_numeric_stats(non_numeric_flat)
+    with span("non_numeric", file=file_name, part=part):
+        print_non_numeric_stats(non_numeric_flat)
 
     return numeric_agg, non_numeric_flat
 
+def process_chunked_part(file_name, part, state):
+    # CHUNK_ROWS: the part's per-column stats were folded during the chunked read; print them like the frame path does
+    if state is None:
+        print(f"  ⚠️ Missing {' or '.join(repr(col) for col in PART_KEYS[part])} column.")
+        return {}, {}
+    grouped = " (Grouped)" if PART_KEYS[part] else ""
+    print(f"\n-- Numeric Stats Per Column{grouped} --")
+    with span("numeric", file=file_name, part=part):
+        print_moment_stats(state['numeric'], PERCENTILES)
+    print(f"\n-- Non-Numeric Stats Per Column{grouped} --")
+    with span("non_numeric", file=file_name, part=part):
+        print_counter_stats(state['non_numeric'])
+    return state['numeric'], state['non_numeric']
+
 # === Master Runner ===
-def run_analysis(part):
-    print(f"\n====================== 📊 PART {part} ANALYSIS ======================\n")
-    all_numeric_vals = []
-    all_non_numeric_vals = []
+def summarize_file_part(file_name, path, part, loaded=None):
+    # Print one file's part; return its share of the global stats
+    numeric, non_numeric = process_file_part(file_name, path, part, loaded)
+    file_numeric = RunningStats(QUANTILE_K if PERCENTILES else None)
+    file_non_numeric = Counter()
+    if CHUNK_ROWS:
+        fold_into(numeric, non_numeric, file_numeric, file_non_numeric, skip=("page_id", "ad_id"))
+    else:
+        fold_numeric(numeric.drop(columns=["page_id", "ad_id"], errors='ignore'), file_numeric)
+        fold_non_numeric(non_numeric.drop(columns=["page_id", "ad_id"], errors='ignore'), file_non_numeric)
+    return file_numeric, file_non_numeric
 
-    for file_name, path in csv_files.items():
-        numeric_df, non_numeric_df = process_file_part(file_name, path, part)
+def analyze_file(file_name, path, parts):
+    # Scheduler task: every part of one file, its output held back so files can run side by side
+    with span("file", file=file_name):
+        loaded = load_frame(path, parts) if SINGLE_SCAN else None
+        reports = {}
+        for part in parts:
+            with capture_output() as out:
+                file_numeric, file_non_numeric = summarize_file_part(file_name, path, part, loaded)
+            reports[part] = (out.getvalue(), file_numeric, file_non_numeric)
+        return reports
 
-        for col in numeric_df.columns:
-            if col not in ("page_id", "ad_id"):
-                all_numeric_vals.extend(numeric_df[col].dropna().tolist())
+def run_analysis(part, files=None, reports=None):
+    print(f"\n====================== 📊 PART {part} ANALYSIS ======================\n")
+    all_numeric = RunningStats(QUANTILE_K if PERCENTILES else None)
+    all_non_numeric = Counter()
 
-        for col in non_numeric_df.columns:
-            if col not in ("page_id", "ad_id"):
-                all_non_numeric_vals.extend(non_numeric_df[col].dropna().tolist())
+    for file_name, path in (files or csv_files).items():
+        if reports:
+            text, file_numeric, file_non_numeric = reports[file_name][part]
+            sys.stdout.write(text)
+        else:
+            file_numeric, file_non_numeric = summarize_file_part(file_name, path, part)
+        all_numeric.merge(file_numeric)
+        all_non_numeric.update(file_non_numeric)
 
     print(f"\n====================== 🌍 Overall Global Stats (All Files Combined) ======================")
-    print_overall_stats(all_numeric_vals, is_numeric=True)
-    print_overall_stats(all_non_numeric_vals, is_numeric=False)
+    with span("global", part=part):
+        print_overall_stats(all_numeric, is_numeric=True)
+        print_overall_stats(all_non_numeric, is_numeric=False)
+
+# === Joined Stats ===
+def join_table(index, path, group_cols, measures):
+    # Join one chunk at a time to the indexed main columns and add up its per-group partial sums
+    header = pd.read_csv(path, nrows=0).columns
+    from_main = [col for col in (*group_cols, *measures) if col not in header and col != JOIN_KEY]
+    if any(col not in index.columns for col in from_main):
+        return None
+    usecols = [col for col in header if col == JOIN_KEY or col in group_cols or col in measures]
+    aggs = {"rows": (JOIN_KEY, "size")}
+    for i, col in enumerate(measures):
+        aggs[f"sum{i}"] = (col, "sum")
+        aggs[f"n{i}"] = (col, "count")
+    totals, joined, unmatched = None, 0, 0
+    for chunk in pd.read_csv(path, usecols=usecols, dtype={JOIN_KEY: str}, nrows=ROW_LIMIT, chunksize=JOIN_CHUNK_ROWS):
+        for col in measures:
+            if col in chunk:
+                chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+        hit = chunk[JOIN_KEY].isin(index.index)
+        unmatched += int((~hit).sum())
+        merged = chunk[hit].join(index[from_main], on=JOIN_KEY, how="inner")
+        joined += len(merged)
+        part = merged.groupby(list(group_cols), sort=False, dropna=False).agg(**aggs)
+        totals = part if totals is None else totals.add(part, fill_value=0)
+    groups = {}
+    if totals is not None:
+        for key, row in zip(totals.index, totals.itertuples(index=False)):
+            key = key if isinstance(key, tuple) else (key,)
+            groups[key] = [int(row[0])] + [[float(row[1 + 2 * i]), int(row[2 + 2 * i])] for i in range(len(measures))]
+    return groups, joined, unmatched
+
+def run_join_analysis(files=None):
+    files = files or csv_files
+    print(f"\n====================== 🔗 JOINED STATS (on ad_id) ======================")
+    if "main_ads_cleaned.csv" not in files:
+        print("⚠️ main_ads_cleaned.csv is needed to join the unpacked tables.")
+        return
+    with span("join_index") as sp:
+        # Only the columns the joins use, indexed by ad_id: the build side of every join
+        wanted = set(main_columns(JOINS)) | {JOIN_KEY}
+        index = pd.read_csv(files["main_ads_cleaned.csv"], usecols=lambda col: col in wanted,
+                            dtype={JOIN_KEY: str}, nrows=ROW_LIMIT).set_index(JOIN_KEY)
+        for col in {col for _, _, measures in JOINS.values() for col in measures} & set(index.columns):
+            index[col] = pd.to_numeric(index[col], errors="coerce")
+        sp.add(rows=len(index))
+    for name, (table, group_cols, measures) in JOINS.items():
+        if table not in files:
+            continue
+        with span("join", join=name) as sp:
+            result = join_table(index, files[table], group_cols, measures)
+            if result is None:
+                print(f"\n⚠️ {name}: a column of {group_cols + measures} is in neither {table} nor main_ads_cleaned.csv")
+                continue
+            groups, joined, unmatched = result
+            sp.add(rows=joined + unmatched)
+            print_join(name, table, groups, joined, unmatched, group_cols, measures)
 
 # === Run All Parts ===
-for part in [1, 2, 3]:
-    run_analysis(part)
+def main(parts=(1, 2, 3), files=None):
+    files = files or csv_files
+    reports = None
+    if FILE_WORKERS > 1:
+        reports = run_files(analyze_file, files, (parts,), FILE_WORKERS, threads=False, budget=MEMORY_BUDGET,
+                            cost=lambda path: memory_estimate(path, MEMORY_PER_BYTE, ROW_LIMIT))
+    elif SINGLE_SCAN:
+        # One file at a time: its frame is dropped once every part is summarised, the output is replayed part by part
+        reports = {file_name: analyze_file(file_name, path, parts) for file_name, path in files.items()}
+    for part in parts:
+        with span("part", part=part):
+            run_analysis(part, files, reports)
+    if JOIN_STATS:
+        run_join_analysis(files)
+
+if __name__ == "__main__":
+    main()
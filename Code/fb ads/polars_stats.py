@@ -1,4 +1,15 @@
+import os
+import sys
 import polars as pl
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from accumulators import RunningStats
+from columns import read_header, select_columns
+from csv_cache import cached_ipc_path
+from hash_join import JOIN_KEY, main_columns, print_join
+from profiling import span
+from scheduler import capture_output, memory_estimate, run_files
 
 # === Configuration ===
 csv_files = {
@@ -9,111 +20,298 @@ csv_files = {
     "unpacked_delivery_by_region.csv": r"C:\Users\puroh\OneDrive\Documents\Syracuse\RA\Task_03_Descriptive_Stats\Unpacked Data\fb ads\unpacked_delivery_by_region.csv",
 }
 ROW_LIMIT = 500
+COLUMNS = None  # columns to read: None for all, a columns.PRESETS name (e.g. "fb-ads") or {"include": [...], "exclude": [...], "pattern": regex, "exclude_pattern": regex}
+USE_CACHE = False  # convert each CSV to a memory-mapped Arrow IPC cache on first read (needs pyarrow); row-limited runs only reuse an existing cache
+PERCENTILES = ()  # e.g. (0.5, 0.95): adds percentiles to the numeric stats (the global ones also collect the numeric columns for the sketch)
+QUANTILE_K = 200  # KLL sketch size behind the global percentiles (per-column ones stay exact)
+SINGLE_SCAN = True  # load each file once and reuse the frame for Parts 1-3
+FILE_WORKERS = 1  # >1 analyses the files concurrently in threads (Polars releases the GIL), largest first; output keeps the csv_files order
+MEMORY_BUDGET = None  # e.g. 4 * 2**30: only start another file while the running files' estimated memory fits
+MEMORY_PER_BYTE = 3  # rough peak memory per CSV byte read, for MEMORY_BUDGET
+LAZY = True  # build scan_csv query plans (row limit + projection pushed down) instead of read_csv
+ENGINE = "streaming"  # Polars engine used to collect the query plans
+PART_KEYS = {1: (), 2: ("page_id",), 3: ("page_id", "ad_id")}
+JOIN_STATS = False  # also stream each JOINS table against an ad_id index of main_ads_cleaned.csv
+JOINS = {  # name -> (unpacked table, group columns, summed measures); columns the table lacks come from main_ads_cleaned.csv
+    "spend per region per page": ("unpacked_delivery_by_region.csv", ("page_id", "region"), ("region_spend", "region_impressions")),
+    "impressions per platform per ad": ("unpacked_platforms.csv", ("platform", "ad_id"), ("estimated_impressions",)),
+    "spend per demographic": ("unpacked_demographics.csv", ("gender", "age_range"), ("demo_spend", "estimated_spend")),
+    "audience per mention": ("unpacked_mentions.csv", ("mention",), ("estimated_audience_size",)),
+}
 
 # === Helpers ===
 def is_numeric_dtype(dtype):
     return dtype.is_numeric()
 
-def print_numeric_stats(df):
-    if df.is_empty() or not df.columns:
+def collect(*queries):
+    return pl.collect_all(queries, engine=ENGINE)
+
+def print_numeric_stats(numeric):
+    rows, stats, _ = numeric
+    if not rows or not stats:
         print("  ⚠️ No numeric columns found.")
         return
-    for col in df.columns:
-        s = df[col].drop_nulls()
-        print(f"  📊 {col} -> count: {s.len()}, mean: {s.mean()}, min: {s.min()}, max: {s.max()}, std: {s.std()}")
+    for col, st in stats.items():
+        extra = "".join(f", p{q * 100:g}: {st[f'p{i}']}" for i, q in enumerate(PERCENTILES))
+        print(f"  📊 {col} -> count: {st['count']}, mean: {st['mean']}, min: {st['min']}, max: {st['max']}, std: {st['std']}{extra}")
 
-def print_non_numeric_stats(df):
-    if df.is_empty() or not df.columns:
+def print_non_numeric_stats(non_numeric):
+    rows, counts = non_numeric
+    if not rows or not counts:
         print("  ⚠️ No non-numeric columns found.")
         return
-    for col in df.columns:
-        s = df[col].drop_nulls()
-        if s.is_empty():
+    for col, vc in counts.items():
+        if vc.is_empty():
             continue
-        vc = s.value_counts().sort("count", descending=True)
-        print(f"  🔠 {col} -> count: {s.len()}, unique: {s.n_unique()}, top: {vc[0, col]}, freq: {vc[0, 'count']}")
+        print(f"  🔠 {col} -> count: {vc['count'].sum()}, unique: {vc.height}, top: {vc[0, col]}, freq: {vc[0, 'count']}")
+
+def merge_numeric(acc, other):
+    as_float = isinstance(acc.min, float) or isinstance(other.min, float)  # a float anywhere made the combined Series Float64
+    acc.merge(other)
+    if as_float:
+        acc.min, acc.max = float(acc.min), float(acc.max)
 
-def print_overall_stats(values, is_numeric):
-    s = pl.Series("vals", values).drop_nulls()
-    if s.is_empty():
+def fold_numeric(numeric, acc, skip=()):
+    # Merge each column's collected count/mean/variance/min/max into acc
+    _, stats, values = numeric
+    for col, st in stats.items():
+        if col not in skip and st["count"]:
+            merge_numeric(acc, RunningStats.from_moments(st["count"], st["mean"], st["var"] * st["count"], st["min"], st["max"]))
+    if acc.sketch is not None and values is not None:
+        for col in values.columns:
+            if col not in skip:
+                acc.sketch.update_many(values[col].drop_nulls().to_list())
+
+def fold_non_numeric(non_numeric, counter, skip=()):
+    for col, vc in non_numeric[1].items():
+        if col not in skip:
+            counter.update(dict(vc.iter_rows()))
+
+def print_overall_stats(summary, is_numeric):
+    if (summary.count if is_numeric else len(summary)) == 0:
         print("  ⚠️ No data for global statistics.")
         return
     if is_numeric:
-        print(f"  📉 Global ➡️ Overall Numeric Stats:\n  count: {s.len()}\n  mean: {s.mean()}\n  min: {s.min()}\n  max: {s.max()}\n  std: {s.std()}")
+        std = (summary.m2 / (summary.count - 1)) ** 0.5 if summary.count > 1 else None  # sample std, as Series.std()
+        quantiles = summary.sketch.quantiles(PERCENTILES) if PERCENTILES else []
+        extra = "".join(f"\n  p{q * 100:g}: {val}" for q, val in zip(PERCENTILES, quantiles))
+        print(f"  📉 Global ➡️ Overall Numeric Stats:\n  count: {summary.count}\n  mean: {summary.mean}\n  min: {summary.min}\n  max: {summary.max}\n  std: {std}{extra}")
     else:
-        vc = s.value_counts().sort("count", descending=True)
-        print(f"  📝 Global ➡️ Overall Non-Numeric Stats:\n  total entries: {s.len()}\n  unique values: {s.n_unique()}\n  top: {vc[0, 'vals']}\n  freq: {vc[0, 'count']}")
+        top, freq = summary.most_common(1)[0]
+        print(f"  📝 Global ➡️ Overall Non-Numeric Stats:\n  total entries: {sum(summary.values())}\n  unique values: {len(summary)}\n  top: {top}\n  freq: {freq}")
+
+# === Loader ===
+def load_frame(path):
+    with span("load", file=os.path.basename(path), lazy=LAZY) as sp:
+        try:
+            cached = cached_ipc_path(path, convert=ROW_LIMIT is None) if USE_CACHE else None
+            columns = None if COLUMNS is None else select_columns(read_header(path), COLUMNS, keep=("page_id", "ad_id"))
+            if LAZY:
+                # uncompressed IPC is memory-mapped by scan_ipc
+                lf = pl.scan_ipc(cached, n_rows=ROW_LIMIT) if cached else pl.scan_csv(path, n_rows=ROW_LIMIT)
+                if columns is not None:
+                    lf = lf.select(columns)  # projection pushed into the scan: other columns are never parsed
+                lf.collect_schema()  # fail here, like read_csv, on missing or unreadable files
+                return lf, None  # rows are parsed when the part queries are collected
+            df = pl.read_ipc(cached, n_rows=ROW_LIMIT, columns=columns) if cached else pl.read_csv(path, n_rows=ROW_LIMIT, columns=columns)
+        except Exception as e:
+            return None, e
+        sp.add(rows=df.height, nbytes=os.path.getsize(path) if ROW_LIMIT is None else 0)
+        return df, None
+
+# === Queries ===
+NO_DATA = ((0, {}, None), (0, {}))  # (numeric, non-numeric) summaries of a file that could not be summarised
+
+def numeric_query(lf, cols):
+    # One row: a struct of aggregates per column, so only that row is collected
+    col = pl.col
+    return lf.select([pl.struct(count=col(c).count(), mean=col(c).mean(), var=col(c).var(ddof=0), std=col(c).std(),
+                                min=col(c).min(), max=col(c).max(),
+                                **{f"p{i}": col(c).quantile(q) for i, q in enumerate(PERCENTILES)}).alias(c) for c in cols])
+
+def as_key(col):
+    # Grouping by a Categorical: the streaming group_by would otherwise keep every parsed chunk its String keys point into
+    return pl.col(col).cast(pl.String).cast(pl.Categorical)
+
+def value_counts_query(lf, col, dtype):
+    if dtype != pl.String:
+        return lf.select(col).drop_nulls().group_by(col).len("count").sort("count", descending=True)
+    return (lf.select(as_key(col)).drop_nulls().group_by(col).len("count")
+            .sort("count", descending=True).with_columns(pl.col(col).cast(pl.String)))
+
+def part_queries(lf, part):
+    # Numeric queries for one part: (row count, aggregates, values for the global sketch or None), or None when its group keys are missing
+    schema = lf.collect_schema()
+    numeric_cols = [col for col, dtype in schema.items() if is_numeric_dtype(dtype)]
+    group_cols = list(PART_KEYS[part])
+    if not all(col in schema for col in group_cols):
+        return None
+    if group_cols:
+        numeric_cols = [col for col in numeric_cols if col not in group_cols]
+        lf = lf.group_by([as_key(col) for col in group_cols]).agg(pl.col(numeric_cols).mean()).select(numeric_cols)
+    values = lf.select(numeric_cols) if PERCENTILES else None
+    return lf.select(pl.len()), numeric_query(lf, numeric_cols), values
+
+def collect_parts(file_name, df, parts):
+    """Every part's aggregations on one file, collected together: collect_all
+    shares the scans between them, so a LazyFrame's CSV is parsed once for all
+    parts, and only per-column aggregates and value counts are materialised.
+    Returns {part: (numeric, non-numeric) summaries or None}."""
+    lf = df.lazy()
+    schema = lf.collect_schema()
+    non_numeric_cols = [col for col, dtype in schema.items() if not is_numeric_dtype(dtype)]
+    numeric = {part: part_queries(lf, part) for part in parts}
+    queries = [lf.select(pl.len()), *[value_counts_query(lf, col, schema[col]) for col in non_numeric_cols]]
+    queries += [query for triple in numeric.values() if triple is not None for query in triple if query is not None]
+    with span("collect", file=file_name, parts=list(parts)) as sp:
+        results = iter(collect(*queries))
+        rows = next(results).item()
+        non_numeric = (rows, {col: next(results) for col in non_numeric_cols})
+        collected = {}
+        for part, triple in numeric.items():
+            if triple is None:
+                collected[part] = None
+                continue
+            groups, stats, values = [None if query is None else next(results) for query in triple]
+            stats = {col: stats[0, col] for col in stats.columns}
+            collected[part] = ((groups.item(), stats, values), non_numeric)
+        sp.add(rows=rows)
+    return collected
 
 # === Part Processor ===
-def process_file_part(file_name, path, part):
+def process_file_part(file_name, path, part, loaded=None, collected=None):
     print(f"\n==== 📂 File: {file_name} | Part {part} ====")
-    try:
-        df = pl.read_csv(path).head(ROW_LIMIT)
-    except Exception as e:
-        print(f"  ⚠️ Failed to load file: {e}")
-        return pl.DataFrame(), pl.DataFrame()
-
-    numeric_cols = [col for col in df.columns if is_numeric_dtype(df[col].dtype)]
-    non_numeric_cols = [col for col in df.columns if not is_numeric_dtype(df[col].dtype)]
+    df, error = loaded if loaded is not None else load_frame(path)
+    if error is not None:
+        print(f"  ⚠️ Failed to load file: {error}")
+        return NO_DATA
+    result = (collected or collect_parts(file_name, df, [part]))[part]
 
     if part == 1:
+        numeric, non_numeric = result
+
         print("\n-- Numeric Stats Per Column --")
-        print_numeric_stats(df.select(numeric_cols))
+        with span("numeric", file=file_name, part=part):
+            print_numeric_stats(numeric)
 
         print("\n-- Non-Numeric Stats Per Column --")
-        print_non_numeric_stats(df.select(non_numeric_cols))
-
-        return df.select(numeric_cols), df.select(non_numeric_cols)
+        with span("non_numeric", file=file_name, part=part):
+            print_non_numeric_stats(non_numeric)
 
-    # Grouping logic
-    group_cols = []
-    if part == 2:
-        group_cols = ["page_id"]
-    elif part == 3:
-        group_cols = ["page_id", "ad_id"]
+        return numeric, non_numeric
 
-    if not all(col in df.columns for col in group_cols):
-        print(f"  ⚠️ Missing required grouping columns: {group_cols}")
-        return pl.DataFrame(), pl.DataFrame()
-
-    grouped = df.group_by(group_cols)
-    numeric_agg = grouped.mean().select([col for col in numeric_cols if col not in group_cols]) if numeric_cols else pl.DataFrame()
-
-    non_numeric_flat = []
-    if non_numeric_cols:
-        for _, group_df in grouped:
-            non_numeric_flat.append(group_df.select(non_numeric_cols))
-    non_numeric_df = pl.concat(non_numeric_flat) if non_numeric_flat else pl.DataFrame()
+    if result is None:
+        print(f"  ⚠️ Missing required grouping columns: {list(PART_KEYS[part])}")
+        return NO_DATA
+    numeric_agg, non_numeric = result
 
     print("\n-- Numeric Stats Per Column (Grouped) --")
-    print_numeric_stats(numeric_agg)
+    with span("numeric", file=file_name, part=part):
+        print_numeric_stats(numeric_agg)
 
     print("\n-- Non-Numeric Stats Per Column (Grouped) --")
-    print_non_numeric_stats(non_numeric_df)
+    with span("non_numeric", file=file_name, part=part):
+        print_non_numeric_stats(non_numeric)
 
-    return numeric_agg, non_numeric_df
+    return numeric_agg, non_numeric
 
 # === Master Runner ===
-def run_analysis(part):
-    print(f"\n====================== 📊 PART {part} ANALYSIS ======================\n")
-    all_numeric_vals = []
-    all_non_numeric_vals = []
+def summarize_file_part(file_name, path, part, loaded=None, collected=None):
+    # Print one file's part; return its share of the global stats
+    numeric, non_numeric = process_file_part(file_name, path, part, loaded, collected)
+    file_numeric = RunningStats(QUANTILE_K if PERCENTILES else None)
+    file_non_numeric = Counter()
+    fold_numeric(numeric, file_numeric, skip=("page_id", "ad_id"))
+    fold_non_numeric(non_numeric, file_non_numeric, skip=("page_id", "ad_id"))
+    return file_numeric, file_non_numeric
 
-    for file_name, path in csv_files.items():
-        numeric_df, non_numeric_df = process_file_part(file_name, path, part)
+def analyze_file(file_name, path, parts):
+    # Scheduler task: every part of one file, its output held back so files can run side by side
+    with span("file", file=file_name):
+        loaded = load_frame(path) if SINGLE_SCAN else None
+        collected = collect_parts(file_name, loaded[0], parts) if loaded and loaded[1] is None else None
+        reports = {}
+        for part in parts:
+            with capture_output() as out:
+                file_numeric, file_non_numeric = summarize_file_part(file_name, path, part, loaded, collected)
+            reports[part] = (out.getvalue(), file_numeric, file_non_numeric)
+        return reports
 
-        for col in numeric_df.columns:
-            if col not in ("page_id", "ad_id"):
-                all_numeric_vals.extend(numeric_df[col].drop_nulls().to_list())
+def run_analysis(part, files=None, reports=None):
+    print(f"\n====================== 📊 PART {part} ANALYSIS ======================\n")
+    all_numeric = RunningStats(QUANTILE_K if PERCENTILES else None)
+    all_non_numeric = Counter()
 
-        for col in non_numeric_df.columns:
-            if col not in ("page_id", "ad_id"):
-                all_non_numeric_vals.extend(non_numeric_df[col].drop_nulls().to_list())
+    for file_name, path in (files or csv_files).items():
+        if reports:
+            text, file_numeric, file_non_numeric = reports[file_name][part]
+            sys.stdout.write(text)
+        else:
+            file_numeric, file_non_numeric = summarize_file_part(file_name, path, part)
+        merge_numeric(all_numeric, file_numeric)
+        all_non_numeric.update(file_non_numeric)
 
     print(f"\n====================== 🌍 Overall Global Stats (All Files Combined) ======================")
-    print_overall_stats(all_numeric_vals, is_numeric=True)
-    print_overall_stats(all_non_numeric_vals, is_numeric=False)
+    with span("global", part=part):
+        print_overall_stats(all_numeric, is_numeric=True)
+        print_overall_stats(all_non_numeric, is_numeric=False)
+
+# === Joined Stats ===
+def join_query(index, path, group_cols, measures):
+    # Hash join + group_by in one plan: the streaming engine builds on the small index side and never holds the joined rows
+    lf = pl.scan_csv(path, n_rows=ROW_LIMIT, infer_schema_length=10000, schema_overrides={JOIN_KEY: pl.String})
+    header = lf.collect_schema().names()
+    from_main = [col for col in (*group_cols, *measures) if col not in header and col != JOIN_KEY]
+    if any(col not in index.collect_schema().names() for col in from_main):
+        return None
+    numbers = [pl.col(col).cast(pl.Float64, strict=False) for col in measures]
+    grouped = (lf.join(index.select(JOIN_KEY, *from_main), on=JOIN_KEY, how="inner")
+               .group_by(group_cols)
+               .agg(pl.len().alias("rows"), *[x for i, n in enumerate(numbers) for x in (n.sum().alias(f"sum{i}"), n.count().alias(f"n{i}"))]))
+    unmatched = lf.join(index.select(JOIN_KEY), on=JOIN_KEY, how="anti").select(pl.len())
+    return grouped, unmatched
+
+def run_join_analysis(files=None):
+    files = files or csv_files
+    print(f"\n====================== 🔗 JOINED STATS (on ad_id) ======================")
+    if "main_ads_cleaned.csv" not in files:
+        print("⚠️ main_ads_cleaned.csv is needed to join the unpacked tables.")
+        return
+    # Only the columns the joins use; kept lazy so each join plan reads them itself
+    main = pl.scan_csv(files["main_ads_cleaned.csv"], n_rows=ROW_LIMIT, infer_schema_length=10000,
+                       schema_overrides={JOIN_KEY: pl.String})
+    index = main.select(JOIN_KEY, *[col for col in main_columns(JOINS) if col in main.collect_schema().names()])
+    for name, (table, group_cols, measures) in JOINS.items():
+        if table not in files:
+            continue
+        with span("join", join=name) as sp:
+            queries = join_query(index, files[table], group_cols, measures)
+            if queries is None:
+                print(f"\n⚠️ {name}: a column of {group_cols + measures} is in neither {table} nor main_ads_cleaned.csv")
+                continue
+            grouped, unmatched = collect(*queries)
+            width = len(group_cols)
+            groups = {row[:width]: [row[width]] + [[row[width + 1 + 2 * i], row[width + 2 + 2 * i]] for i in range(len(measures))]
+                      for row in grouped.iter_rows()}
+            joined, unmatched = int(grouped["rows"].sum()), unmatched.item()
+            sp.add(rows=joined + unmatched)
+            print_join(name, table, groups, joined, unmatched, group_cols, measures)
 
 # === Run All Parts ===
-for part in [1, 2, 3]:
-    run_analysis(part)
+def main(parts=(1, 2, 3), files=None):
+    files = files or csv_files
+    reports = None
+    if FILE_WORKERS > 1:
+        reports = run_files(analyze_file, files, (parts,), FILE_WORKERS, threads=True, budget=MEMORY_BUDGET,
+                            cost=lambda path: memory_estimate(path, MEMORY_PER_BYTE, ROW_LIMIT))
+    elif SINGLE_SCAN:
+        # One file at a time: its frame is dropped once every part is summarised, the output is replayed part by part
+        reports = {file_name: analyze_file(file_name, path, parts) for file_name, path in files.items()}
+    for part in parts:
+        with span("part", part=part):
+            run_analysis(part, files, reports)
+    if JOIN_STATS:
+        run_join_analysis(files)
+
+if __name__ == "__main__":
+    main()
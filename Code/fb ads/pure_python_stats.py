@@ -1,7 +1,22 @@
 
 import csv
-from collections import defaultdict, Counter
-from itertools import islice
+import os
+import sys
+from collections import Counter
+from functools import partial as bind
+from itertools import chain, islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from accumulators import EncodedValues, NumericBuffer, PartialStats, RunningStats, counter_summary, percentile_text
+from checkpoint import incremental_scan
+from columns import select_columns
+from hash_join import build_index, print_join, stream_join
+from parallel_scan import parallel_scan
+from profiling import span
+from sampling import draw_sample, print_sample_report
+from scheduler import capture_output, memory_estimate, run_files
+from schema import resolve_schema, split_columns
+from sketches import ApproxCounter
 
 # === Configuration ===
 csv_files = {
@@ -11,142 +26,233 @@ csv_files = {
     "unpacked_mentions.csv": r"C:\Users\puroh\OneDrive\Documents\Syracuse\RA\Task_03_Descriptive_Stats\Unpacked Data\fb ads\unpacked_mentions.csv",
     "unpacked_delivery_by_region.csv": r"C:\Users\puroh\OneDrive\Documents\Syracuse\RA\Task_03_Descriptive_Stats\Unpacked Data\fb ads\unpacked_delivery_by_region.csv",
 }
-ROW_LIMIT = 500
+ROW_LIMIT = 500  # None streams the whole file; memory stays O(columns)
+COLUMNS = None  # columns to read: None for all, a columns.PRESETS name (e.g. "fb-ads") or {"include": [...], "exclude": [...], "pattern": regex, "exclude_pattern": regex}
+WORKERS = os.cpu_count() or 1  # full-file scans (ROW_LIMIT = None) are split across this many processes
+APPROXIMATE = False  # HyperLogLog unique + Space-Saving top/freq: fixed memory per non-numeric column
+UNIQUE_ERROR = 0.02  # HyperLogLog relative standard error
+TOP_ERROR = 0.01  # Space-Saving error: freq is a guaranteed lower bound, at most this share of the column's count under the true one
+PERCENTILES = ()  # e.g. (0.5, 0.95): adds streaming KLL-sketch percentiles to the numeric stats
+QUANTILE_K = 200  # KLL sketch size; rank error shrinks roughly as 1 / QUANTILE_K
+EXACT_VALUES = False  # keep raw values (array('d') numbers, array('I')-coded strings) for exact percentiles
+SAMPLE_SIZE = 100  # rows used to infer the schema; saved next to each CSV as <file>.schema.json and reused
+STATE_DIR = None  # e.g. "stats_state": with ROW_LIMIT = None, checkpoint each file's stats there and only parse rows appended since the last run
+SAMPLING = None  # "reservoir": Parts see a uniform SAMPLE_ROWS-row sample of the whole file instead of its first ROW_LIMIT rows; "stratified": the same sample with its means post-stratified by SAMPLE_STRATA
+SAMPLE_ROWS = 500  # total sample size; memory stays SAMPLE_ROWS rows however long the file and however many strata
+SAMPLE_STRATA = "page_id"  # column to stratify by
+SAMPLE_SEED = 0  # same file and seed, same sample
+CONFIDENCE = 0.95  # level of the intervals on the sampled whole-file means
+SINGLE_SCAN = True  # read each file once and feed Parts 1-3 together
+FILE_WORKERS = 1  # >1 analyses the files concurrently in processes, largest first; output keeps the csv_files order
+MEMORY_BUDGET = None  # e.g. 4 * 2**30: only start another file while the running files' estimated memory fits
+MEMORY_PER_BYTE = 1  # rough peak memory per CSV byte read, for MEMORY_BUDGET
+PART_KEYS = {1: (), 2: ("page_id",), 3: ("page_id", "ad_id")}
+JOIN_STATS = False  # also stream each JOINS table against an ad_id index of main_ads_cleaned.csv
+JOINS = {  # name -> (unpacked table, group columns, summed measures); columns the table lacks come from main_ads_cleaned.csv
+    "spend per region per page": ("unpacked_delivery_by_region.csv", ("page_id", "region"), ("region_spend", "region_impressions")),
+    "impressions per platform per ad": ("unpacked_platforms.csv", ("platform", "ad_id"), ("estimated_impressions",)),
+    "spend per demographic": ("unpacked_demographics.csv", ("gender", "age_range"), ("demo_spend", "estimated_spend")),
+    "audience per mention": ("unpacked_mentions.csv", ("mention",), ("estimated_audience_size",)),
+}
 
 # === Helpers ===
-def try_parse_float(val):
-    try:
-        return float(val)
-    except:
-        return None
+def value_counter_factory():
+    if APPROXIMATE:
+        return bind(ApproxCounter, UNIQUE_ERROR, TOP_ERROR)
+    return EncodedValues if EXACT_VALUES else Counter
+
+def numeric_stats_factory():
+    if EXACT_VALUES:
+        return NumericBuffer
+    return bind(RunningStats, QUANTILE_K) if PERCENTILES else RunningStats
 
 def compute_basic_stats(values):
-    if not values:
-        return {'count': 0, 'mean': None, 'min': None, 'max': None, 'std': None}
-    count = len(values)
-    mean = sum(values) / count
-    std = (sum((x - mean) ** 2 for x in values) / count) ** 0.5 if count > 1 else 0
-    return {'count': count, 'mean': mean, 'min': min(values), 'max': max(values), 'std': std}
-
-def detect_column_types(path, sample_size=100):
-    numeric_cols, non_numeric_cols = set(), set()
-    with open(path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        col_samples = defaultdict(list)
-        for i, row in enumerate(reader):
-            for col, val in row.items():
-                val = val.strip()
-                if val:
-                    col_samples[col].append(val)
-            if i >= sample_size:
-                break
-    for col, samples in col_samples.items():
-        numeric_count = sum(1 for val in samples if try_parse_float(val) is not None)
-        if numeric_count >= 0.8 * len(samples):
-            numeric_cols.add(col)
-        else:
-            non_numeric_cols.add(col)
-    return list(numeric_cols), list(non_numeric_cols)
+    if not isinstance(values, (RunningStats, NumericBuffer)):
+        values = RunningStats.from_values(values)
+    return values.as_dict(PERCENTILES)
 
 def print_column_stats(stats_dict, is_numeric):
     for col, values in stats_dict.items():
         if is_numeric:
             stats = compute_basic_stats(values)
-            print(f"  📊 {col} -> count: {stats['count']}, mean: {stats['mean']}, min: {stats['min']}, max: {stats['max']}, std: {stats['std']}")
+            print(f"  📊 {col} -> count: {stats['count']}, mean: {stats['mean']}, min: {stats['min']}, max: {stats['max']}, std: {stats['std']}{percentile_text(stats)}")
         else:
-            if not values:
+            summary = counter_summary(values)
+            if summary is None:
                 continue
-            counter = Counter(values)
-            top_val, freq = counter.most_common(1)[0]
-            print(f"  🔠 {col} -> count: {len(values)}, unique: {len(counter)}, top: {top_val}, freq: {freq}")
+            print(f"  🔠 {col} -> count: {summary['count']}, unique: {summary['unique']}, top: {summary['top']}, freq: {summary['freq']}")
 
 def print_overall_stats(all_values, is_numeric):
     if is_numeric:
         stats = compute_basic_stats(all_values)
-        print(f"  📉 Global ➡️ Overall Numeric Stats:\n  count: {stats['count']}\n  mean: {stats['mean']}\n  min: {stats['min']}\n  max: {stats['max']}\n  std: {stats['std']}")
+        print(f"  📉 Global ➡️ Overall Numeric Stats:\n  count: {stats['count']}\n  mean: {stats['mean']}\n  min: {stats['min']}\n  max: {stats['max']}\n  std: {stats['std']}{percentile_text(stats, multiline=True)}")
     else:
-        if not all_values:
+        summary = counter_summary(all_values)
+        if summary is None:
             return
-        counter = Counter(all_values)
-        top_val, freq = counter.most_common(1)[0]
-        print(f"  📝 Global ➡️ Overall Non-Numeric Stats:\n  total entries: {len(all_values)}\n  unique values: {len(counter)}\n  top: {top_val}\n  freq: {freq}")
+        print(f"  📝 Global ➡️ Overall Non-Numeric Stats:\n  total entries: {summary['count']}\n  unique values: {summary['unique']}\n  top: {summary['top']}\n  freq: {summary['freq']}")
+
+# === Scanner ===
+def sampled_scan(path, header, rows, numeric_cols, non_numeric_cols, groupings):
+    # SAMPLING: every part sees one sample of the whole file; each partial also carries the whole-file mean estimates
+    if SAMPLING not in ("reservoir", "stratified") or (SAMPLING == "stratified" and not SAMPLE_STRATA):
+        raise ValueError(f"SAMPLING must be None, 'reservoir' or 'stratified' (with SAMPLE_STRATA set), not {SAMPLING!r}")
+    with span("sample", file=os.path.basename(path), method=SAMPLING) as sp:
+        drawn = draw_sample(rows, SAMPLE_ROWS, header, SAMPLE_STRATA if SAMPLING == "stratified" else None, SAMPLE_SEED)
+        sp.add(rows=drawn.seen, nbytes=os.path.getsize(path))
+    partials = {part: PartialStats(numeric_cols, non_numeric_cols, key_cols, value_counter_factory(), numeric_stats_factory()).bind(header)
+                for part, key_cols in groupings.items()}
+    for row in drawn.rows():
+        for partial in partials.values():
+            partial.add_fields(row)
+    report = drawn.report(header, numeric_cols, CONFIDENCE)
+    for partial in partials.values():
+        partial.sample_report = report
+    return partials
+
+def scan_file(path, parts, workers=None):
+    workers = workers or WORKERS
+    with span("scan", file=os.path.basename(path), parts=list(parts)) as sp:
+        with open(path, 'r', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            rows = islice(filter(None, reader), None if SAMPLING else ROW_LIMIT)  # blank lines skipped, as DictReader did
+            with span("schema", file=os.path.basename(path)):
+                schema, sample = resolve_schema(path, header, rows, SAMPLE_SIZE)
+            numeric_cols, non_numeric_cols = split_columns(schema)
+            keep = ("page_id", "ad_id")  # group keys are read whatever COLUMNS says, as in the pandas/Polars scripts
+            numeric_cols, non_numeric_cols = select_columns(numeric_cols, COLUMNS, keep), select_columns(non_numeric_cols, COLUMNS, keep)
+            groupings = {part: PART_KEYS[part] for part in parts}
+            if SAMPLING:
+                return sampled_scan(path, header, chain(sample, rows), numeric_cols, non_numeric_cols, groupings)
+            if STATE_DIR and ROW_LIMIT is None:
+                sp.add(nbytes=os.path.getsize(path))
+                return incremental_scan(path, STATE_DIR, numeric_cols, non_numeric_cols, groupings, workers,
+                                        counter_factory=value_counter_factory(), stats_factory=numeric_stats_factory())
+            if ROW_LIMIT is not None or workers <= 1:
+                partials = {part: PartialStats(numeric_cols, non_numeric_cols, key_cols, value_counter_factory(), numeric_stats_factory()).bind(header)
+                            for part, key_cols in groupings.items()}
+                n_rows = 0
+                for n_rows, row in enumerate(chain(sample, rows), 1):
+                    for partial in partials.values():
+                        partial.add_fields(row)
+                sp.add(rows=n_rows, nbytes=os.path.getsize(path) if ROW_LIMIT is None else 0)
+                return partials
+        sp.add(nbytes=os.path.getsize(path))
+        return parallel_scan(path, numeric_cols, non_numeric_cols, groupings, workers,
+                             counter_factory=value_counter_factory(), stats_factory=numeric_stats_factory())
 
 # === Part Processor ===
-def process_file_part(file_name, path, part):
+def process_file_part(file_name, path, part, partial=None):
     print(f"\n==== 📂 File: {file_name} | Part {part} ====")
-    numeric_cols, non_numeric_cols = detect_column_types(path)
-    numeric_data = defaultdict(list)
-    non_numeric_data = defaultdict(list)
-    grouped_data = defaultdict(lambda: (defaultdict(list), defaultdict(list)))
-
-    with open(path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in islice(reader, ROW_LIMIT):
-            key = None
-            if part == 1:
-                key = None
-            elif part == 2:
-                key = row.get("page_id")
-            elif part == 3:
-                key = (row.get("page_id"), row.get("ad_id"))
-
-            for col in numeric_cols:
-                val = try_parse_float(row.get(col))
-                if val is not None:
-                    if part == 1:
-                        numeric_data[col].append(val)
-                    else:
-                        grouped_data[key][0][col].append(val)
-            for col in non_numeric_cols:
-                val = row.get(col, "").strip()
-                if val:
-                    if part == 1:
-                        non_numeric_data[col].append(val)
-                    else:
-                        grouped_data[key][1][col].append(val)
+    if partial is None:
+        partial = scan_file(path, [part])[part]
 
     if part == 1:
+        numeric_data, non_numeric_data = partial.numeric, partial.non_numeric
         print("\n-- Numeric Stats Per Column --")
-        print_column_stats(numeric_data, is_numeric=True)
+        with span("numeric", file=file_name, part=part):
+            print_column_stats(numeric_data, is_numeric=True)
+        report = getattr(partial, "sample_report", None)
+        if report:
+            print_sample_report(report)
         print("\n-- Non-Numeric Stats Per Column --")
-        print_column_stats(non_numeric_data, is_numeric=False)
+        with span("non_numeric", file=file_name, part=part):
+            print_column_stats(non_numeric_data, is_numeric=False)
         return numeric_data, non_numeric_data
     else:
-        agg_numeric = defaultdict(list)
-        agg_non_numeric = defaultdict(list)
-        for group, (num_data, nonnum_data) in grouped_data.items():
-            for col, vals in num_data.items():
-                if vals:
-                    mean_val = sum(vals) / len(vals)
-                    agg_numeric[col].append(mean_val)
-            for col, vals in nonnum_data.items():
-                agg_non_numeric[col].extend(vals)
+        with span("group", file=file_name, part=part):
+            agg_numeric = partial.group_means()
+        agg_non_numeric = partial.non_numeric
 
         print("\n-- Numeric Stats Per Column (Grouped) --")
-        print_column_stats(agg_numeric, is_numeric=True)
+        with span("numeric", file=file_name, part=part):
+            print_column_stats(agg_numeric, is_numeric=True)
         print("\n-- Non-Numeric Stats Per Column (Grouped) --")
-        print_column_stats(agg_non_numeric, is_numeric=False)
+        with span("non_numeric", file=file_name, part=part):
+            print_column_stats(agg_non_numeric, is_numeric=False)
         return agg_numeric, agg_non_numeric
 
 # === Master Runner ===
-def run_analysis(part):
+def summarize_file_part(file_name, path, part, partial=None):
+    # Print one file's part; return its share of the global stats
+    numeric_data, non_numeric_data = process_file_part(file_name, path, part, partial)
+    file_numeric = numeric_stats_factory()()
+    file_non_numeric = value_counter_factory()()
+    for col, acc in numeric_data.items():
+        if col not in ("page_id", "ad_id"):
+            file_numeric.merge(acc)
+    for col, counter in non_numeric_data.items():
+        if col not in ("page_id", "ad_id"):
+            file_non_numeric.update(counter)
+    return file_numeric, file_non_numeric
+
+def analyze_file(file_name, path, parts):
+    # Scheduler task: every part of one file, its output held back so files can run side by side
+    with span("file", file=file_name):
+        scans = scan_file(path, parts, max(1, WORKERS // FILE_WORKERS)) if SINGLE_SCAN else {}
+        reports = {}
+        for part in parts:
+            with capture_output() as out:
+                file_numeric, file_non_numeric = summarize_file_part(file_name, path, part, scans.get(part))
+            reports[part] = (out.getvalue(), file_numeric, file_non_numeric)
+        return reports
+
+def run_analysis(part, scans=None, files=None, reports=None):
     print(f"\n====================== 📊 PART {part} ANALYSIS ======================\n")
-    all_numeric_vals = []
-    all_non_numeric_vals = []
-
-    for file_name, path in csv_files.items():
-        numeric_data, non_numeric_data = process_file_part(file_name, path, part)
-        for col, vals in numeric_data.items():
-            if col not in ("page_id", "ad_id"):
-                all_numeric_vals.extend(vals)
-        for col, vals in non_numeric_data.items():
-            if col not in ("page_id", "ad_id"):
-                all_non_numeric_vals.extend(vals)
+    all_numeric_vals = numeric_stats_factory()()
+    all_non_numeric_vals = value_counter_factory()()
+
+    for file_name, path in (files or csv_files).items():
+        if reports:
+            text, file_numeric, file_non_numeric = reports[file_name][part]
+            sys.stdout.write(text)
+        else:
+            partial = scans[file_name][part] if scans else None
+            file_numeric, file_non_numeric = summarize_file_part(file_name, path, part, partial)
+        all_numeric_vals.merge(file_numeric)
+        all_non_numeric_vals.update(file_non_numeric)
 
     print(f"\n====================== 🌍 Overall Global Stats (All Files Combined) ======================")
-    print_overall_stats(all_numeric_vals, is_numeric=True)
-    print_overall_stats(all_non_numeric_vals, is_numeric=False)
+    with span("global", part=part):
+        print_overall_stats(all_numeric_vals, is_numeric=True)
+        print_overall_stats(all_non_numeric_vals, is_numeric=False)
+
+def run_join_analysis(files=None):
+    files = files or csv_files
+    print(f"\n====================== 🔗 JOINED STATS (on ad_id) ======================")
+    if "main_ads_cleaned.csv" not in files:
+        print("⚠️ main_ads_cleaned.csv is needed to join the unpacked tables.")
+        return
+    with span("join_index") as sp:
+        index, index_cols = build_index(files["main_ads_cleaned.csv"], JOINS, ROW_LIMIT)
+        sp.add(rows=sum(map(len, index.values())))
+    for name, (table, group_cols, measures) in JOINS.items():
+        if table not in files:
+            continue
+        with span("join", join=name) as sp:
+            result = stream_join(index, index_cols, files[table], group_cols, measures, ROW_LIMIT)
+            if result is None:
+                print(f"\n⚠️ {name}: a column of {group_cols + measures} is in neither {table} nor main_ads_cleaned.csv")
+                continue
+            groups, joined, unmatched = result
+            sp.add(rows=joined + unmatched)
+            print_join(name, table, groups, joined, unmatched, group_cols, measures)
 
 # Run all parts
-for part in [1, 2, 3]:
-    run_analysis(part)
+def main(parts=(1, 2, 3), files=None):
+    files = files or csv_files
+    scans = reports = None
+    if FILE_WORKERS > 1:
+        reports = run_files(analyze_file, files, (parts,), FILE_WORKERS, budget=MEMORY_BUDGET,
+                            cost=lambda path: memory_estimate(path, MEMORY_PER_BYTE, ROW_LIMIT))
+    elif SINGLE_SCAN:
+        scans = {file_name: scan_file(path, parts) for file_name, path in files.items()}
+    for part in parts:
+        with span("part", part=part):
+            run_analysis(part, scans, files, reports)
+    if JOIN_STATS:
+        run_join_analysis(files)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,25 @@
+import os
+import sys
 import pandas as pd
 from collections import Counter
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from accumulators import RunningStats
+from chunked_scan import fold_into, print_counter_stats, print_moment_stats, scan_chunks
+from columns import read_header, select_columns
+from csv_cache import cached_ipc_path, read_cached_table
+from profiling import span
+
 # === Configuration ===
 file_path = r"C:\Users\puroh\OneDrive\Documents\Syracuse\RA\Task_03_Descriptive_Stats\Data\2024_fb_posts_president_scored_anon.csv"
 ROW_LIMIT = 500
+COLUMNS = None  # columns to read: None for all, a columns.PRESETS name (e.g. "fb-posts") or {"include": [...], "exclude": [...], "pattern": regex, "exclude_pattern": regex}
+CHUNK_ROWS = None  # e.g. 200_000: read_csv in chunks of this many rows folded into mergeable stats, so the whole file (ROW_LIMIT = None) runs in fixed memory; percentiles become KLL estimates
+USE_CACHE = False  # convert each CSV to a memory-mapped Arrow IPC cache on first read (needs pyarrow); row-limited runs only reuse an existing cache
+PERCENTILES = ()  # e.g. (0.5, 0.95): adds percentiles to the numeric stats
+QUANTILE_K = 200  # KLL sketch size behind the global percentiles (per-column ones stay exact)
+SINGLE_SCAN = True  # load each file once and reuse the frame for Parts 1-3
+PART_KEYS = {1: (), 2: ("Facebook_Id",), 3: ("Facebook_Id", "post_id")}
 
 # === Helpers ===
 def print_numeric_stats(df):
@@ -11,8 +27,10 @@ def print_numeric_stats(df):
         print("  ⚠️ No numeric columns found.")
         return
     desc = df.describe().T
+    quantiles = df.quantile(list(PERCENTILES)) if PERCENTILES else None
     for col, row in desc.iterrows():
-        print(f"  📊 {col} -> count: {int(row['count'])}, mean: {row['mean']}, min: {row['min']}, max: {row['max']}, std: {row['std']}")
+        extra = "".join(f", p{q * 100:g}: {quantiles.at[q, col]}" for q in PERCENTILES)
+        print(f"  📊 {col} -> count: {int(row['count'])}, mean: {row['mean']}, min: {row['min']}, max: {row['max']}, std: {row['std']}{extra}")
 
 def print_non_numeric_stats(df):
     if df.empty or df.shape[1] == 0:
@@ -27,36 +45,76 @@ def print_non_numeric_stats(df):
         freq = counter.max()
         print(f"  🔠 {col} -> count: {series.count()}, unique: {series.nunique()}, top: {top_val}, freq: {freq}")
 
-def print_overall_stats(series, is_numeric):
-    series = pd.Series(series).dropna()
-    if series.empty:
+def fold_numeric(df, acc):
+    # Merge each column's count/mean/variance/min/max into acc instead of copying its values out
+    if df.shape[1] == 0:
+        return
+    counts, means, variances, mins, maxs = df.count(), df.mean(), df.var(ddof=0), df.min(), df.max()
+    for col in df.columns:
+        n = int(counts[col])
+        if n:
+            acc.merge(RunningStats.from_moments(n, float(means[col]), float(variances[col]) * n, float(mins[col]), float(maxs[col])))
+            if acc.sketch is not None:
+                acc.sketch.update_many(df[col].dropna().tolist())
+
+def fold_non_numeric(df, counter):
+    for col in df.columns:
+        # sort=False keeps first-appearance order, so ties resolve as they did on the concatenated values
+        counter.update(df[col].value_counts(sort=False).to_dict())
+
+def print_overall_stats(summary, is_numeric):
+    if (summary.count if is_numeric else len(summary)) == 0:
         print("  ⚠️ No data for global statistics.")
         return
     if is_numeric:
-        stats = series.describe()
-        print(f"  📉 Global ➡️ Overall Numeric Stats:\n  count: {int(stats['count'])}\n  mean: {stats['mean']}\n  min: {stats['min']}\n  max: {stats['max']}\n  std: {stats['std']}")
+        std = (summary.m2 / (summary.count - 1)) ** 0.5 if summary.count > 1 else float('nan')  # sample std, as describe()
+        quantiles = summary.sketch.quantiles(PERCENTILES) if PERCENTILES else []
+        extra = "".join(f"\n  p{q * 100:g}: {val}" for q, val in zip(PERCENTILES, quantiles))
+        print(f"  📉 Global ➡️ Overall Numeric Stats:\n  count: {summary.count}\n  mean: {summary.mean}\n  min: {summary.min}\n  max: {summary.max}\n  std: {std}{extra}")
     else:
-        counter = series.value_counts()
-        print(f"  📝 Global ➡️ Overall Non-Numeric Stats:\n  total entries: {series.count()}\n  unique values: {series.nunique()}\n  top: {counter.idxmax()}\n  freq: {counter.max()}")
+        top, freq = summary.most_common(1)[0]
+        print(f"  📝 Global ➡️ Overall Non-Numeric Stats:\n  total entries: {sum(summary.values())}\n  unique values: {len(summary)}\n  top: {top}\n  freq: {freq}")
+
+# === Loader ===
+def load_frame(path, parts=(1, 2, 3)):
+    with span("load", file=os.path.basename(path), chunked=bool(CHUNK_ROWS)) as sp:
+        try:
+            columns = None if COLUMNS is None else select_columns(read_header(path), COLUMNS, keep=("Facebook_Id", "post_id"))
+            if CHUNK_ROWS:
+                # Not a frame: every part's stats, folded chunk by chunk (see process_chunked_part)
+                states, rows = scan_chunks(path, {part: PART_KEYS[part] for part in parts}, CHUNK_ROWS, ROW_LIMIT,
+                                           columns, QUANTILE_K if PERCENTILES else None)
+                sp.add(rows=rows, nbytes=os.path.getsize(path) if ROW_LIMIT is None else 0)
+                return states, None
+            cached = cached_ipc_path(path, convert=ROW_LIMIT is None) if USE_CACHE else None
+            df = read_cached_table(cached, ROW_LIMIT, columns).to_pandas(types_mapper=pd.ArrowDtype) if cached else pd.read_csv(path, nrows=ROW_LIMIT, usecols=columns)
+        except Exception as e:
+            return None, e
+        sp.add(rows=len(df), nbytes=os.path.getsize(path) if ROW_LIMIT is None else 0)
+        return df, None
 
 # === Part Processor ===
-def process_file_part(path, part):
+def process_file_part(path, part, loaded=None):
     print(f"\n==== 📂 File: 2024_fb_posts_president_scored_anon.csv | Part {part} ====")
-    try:
-        df = pd.read_csv(path, nrows=ROW_LIMIT)
-    except Exception as e:
-        print(f"  ⚠️ Failed to load file: {e}")
-        return pd.DataFrame(), pd.DataFrame()
+    df, error = loaded if loaded is not None else load_frame(path, [part])
+    if error is not None:
+        print(f"  ⚠️ Failed to load file: {error}")
+        return ({}, {}) if CHUNK_ROWS else (pd.DataFrame(), pd.DataFrame())
+    file_name = os.path.basename(path)
+    if CHUNK_ROWS:
+        return process_chunked_part(file_name, part, df[part])
 
     numeric_cols = df.select_dtypes(include='number').columns.tolist()
     non_numeric_cols = df.select_dtypes(exclude='number').columns.tolist()
 
     if part == 1:
         print("\n-- Numeric Stats Per Column --")
-        print_numeric_stats(df[numeric_cols])
+        with span("numeric", file=file_name, part=part):
+            print_numeric_stats(df[numeric_cols])
 
         print("\n-- Non-Numeric Stats Per Column --")
-        print_non_numeric_stats(df[non_numeric_cols])
+        with span("non_numeric", file=file_name, part=part):
+            print_non_numeric_stats(df[non_numeric_cols])
 
         return df[numeric_cols], df[non_numeric_cols]
 
@@ -64,45 +122,70 @@ def process_file_part(path, part):
         if 'Facebook_Id' not in df.columns:
             print("  ⚠️ Missing 'Facebook_Id' column.")
             return pd.DataFrame(), pd.DataFrame()
-        grouped = df.groupby('Facebook_Id')
+        group_cols = ['Facebook_Id']
 
     elif part == 3:
         if 'Facebook_Id' not in df.columns or 'post_id' not in df.columns:
             print("  ⚠️ Missing 'Facebook_Id' or 'post_id' column.")
             return pd.DataFrame(), pd.DataFrame()
-        grouped = df.groupby(['Facebook_Id', 'post_id'])
+        group_cols = ['Facebook_Id', 'post_id']
 
-    numeric_agg = grouped[numeric_cols].mean() if numeric_cols else pd.DataFrame()
-    non_numeric_flat = pd.concat([group[non_numeric_cols] for _, group in grouped]) if non_numeric_cols else pd.DataFrame()
+    with span("group", file=file_name, part=part):
+        numeric_agg = df.groupby(group_cols)[numeric_cols].mean() if numeric_cols else pd.DataFrame()
+        # Stacking every group's rows is a row mask: groupby drops rows with a missing key
+        keyed_rows = df[group_cols].notna().all(axis=1)
+        non_numeric_flat = df.loc[keyed_rows, non_numeric_cols] if non_numeric_cols else pd.DataFrame()
 
     print("\n-- Numeric Stats Per Column (Grouped) --")
-    print_numeric_stats(numeric_agg)
+    with span("numeric", file=file_name, part=part):
+        print_numeric_stats(numeric_agg)
 
     print("\n-- Non-Numeric Stats Per Column (Grouped) --")
-    print_non_numeric_stats(non_numeric_flat)
+    with span("non_numeric", file=file_name, part=part):
+        print_non_numeric_stats(non_numeric_flat)
 
     return numeric_agg, non_numeric_flat
 
+def process_chunked_part(file_name, part, state):
+    # CHUNK_ROWS: the part's per-column stats were folded during the chunked read; print them like the frame path does
+    if state is None:
+        print(f"  ⚠️ Missing {' or '.join(repr(col) for col in PART_KEYS[part])} column.")
+        return {}, {}
+    grouped = " (Grouped)" if PART_KEYS[part] else ""
+    print(f"\n-- Numeric Stats Per Column{grouped} --")
+    with span("numeric", file=file_name, part=part):
+        print_moment_stats(state['numeric'], PERCENTILES)
+    print(f"\n-- Non-Numeric Stats Per Column{grouped} --")
+    with span("non_numeric", file=file_name, part=part):
+        print_counter_stats(state['non_numeric'])
+    return state['numeric'], state['non_numeric']
+
 # === Master Runner ===
-def run_analysis(part):
+def run_analysis(part, loaded=None, path=None):
     print(f"\n====================== 📊 PART {part} ANALYSIS ======================\n")
-    all_numeric_vals = []
-    all_non_numeric_vals = []
+    all_numeric = RunningStats(QUANTILE_K if PERCENTILES else None)
+    all_non_numeric = Counter()
 
-    numeric_df, non_numeric_df = process_file_part(file_path, part)
+    numeric, non_numeric = process_file_part(path or file_path, part, loaded)
 
-    for col in numeric_df.columns:
-        if col not in ("Facebook_Id", "post_id"):
-            all_numeric_vals.extend(numeric_df[col].dropna().tolist())
-
-    for col in non_numeric_df.columns:
-        if col not in ("Facebook_Id", "post_id"):
-            all_non_numeric_vals.extend(non_numeric_df[col].dropna().tolist())
+    if CHUNK_ROWS:
+        fold_into(numeric, non_numeric, all_numeric, all_non_numeric, skip=("Facebook_Id", "post_id"))
+    else:
+        fold_numeric(numeric.drop(columns=["Facebook_Id", "post_id"], errors='ignore'), all_numeric)
+        fold_non_numeric(non_numeric.drop(columns=["Facebook_Id", "post_id"], errors='ignore'), all_non_numeric)
 
     print(f"\n====================== 🌍 Overall Global Stats ======================")
-    print_overall_stats(all_numeric_vals, is_numeric=True)
-    print_overall_stats(all_non_numeric_vals, is_numeric=False)
+    with span("global", part=part):
+        print_overall_stats(all_numeric, is_numeric=True)
+        print_overall_stats(all_non_numeric, is_numeric=False)
 
 # === Run All Parts ===
-for part in [1, 2, 3]:
-    run_analysis(part)
+def main(parts=(1, 2, 3), files=None):
+    path = next(iter(files.values())) if files else file_path
+    loaded = load_frame(path, parts) if SINGLE_SCAN else None
+    for part in parts:
+        with span("part", part=part):
+            run_analysis(part, loaded, path)
+
+if __name__ == "__main__":
+    main()
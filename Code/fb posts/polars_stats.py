@@ -1,11 +1,28 @@
+import os
+import sys
 import polars as pl
 from collections import Counter
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from accumulators import RunningStats
+from columns import read_header, select_columns
+from csv_cache import cached_ipc_path
+from profiling import span
+from scheduler import capture_output
+
 # === Configuration ===
 csv_files = {
     "2024_fb_posts_president_scored_anon.csv": r"C:\Users\puroh\OneDrive\Documents\Syracuse\RA\Task_03_Descriptive_Stats\Data\2024_fb_posts_president_scored_anon.csv"
 }
 ROW_LIMIT = 500
+COLUMNS = None  # columns to read: None for all, a columns.PRESETS name (e.g. "fb-posts") or {"include": [...], "exclude": [...], "pattern": regex, "exclude_pattern": regex}
+USE_CACHE = False  # convert each CSV to a memory-mapped Arrow IPC cache on first read (needs pyarrow); row-limited runs only reuse an existing cache
+PERCENTILES = ()  # e.g. (0.5, 0.95): adds percentiles to the numeric stats (the global ones also collect the numeric columns for the sketch)
+QUANTILE_K = 200  # KLL sketch size behind the global percentiles (per-column ones stay exact)
+SINGLE_SCAN = True  # load each file once and reuse the frame for Parts 1-3
+LAZY = True  # build scan_csv query plans (row limit + projection pushed down) instead of read_csv
+ENGINE = "streaming"  # Polars engine used to collect the query plans
+PART_KEYS = {1: (), 2: ("Facebook_Id",), 3: ("Facebook_Id", "post_id")}
 
 # === Helpers ===
 def is_numeric_dtype(dtype):
@@ -15,144 +32,251 @@ def is_numeric_dtype(dtype):
         pl.Float32, pl.Float64
     )
 
-def print_numeric_stats(df):
-    if df.is_empty() or not df.columns:
+def collect(*queries):
+    return pl.collect_all(queries, engine=ENGINE)
+
+def as_float(val):
+    return None if val is None else float(val)
+
+def print_numeric_stats(numeric):
+    rows, stats, _ = numeric
+    if not rows or not stats:
         print("  ⚠️ No numeric columns found.")
         return
-    summary = df.describe()
-    for col in df.columns:
-        if col not in summary.columns:
-            continue
-        col_summary = summary.select(col).to_series().to_list()
-        print(f"  📊 {col} -> count: {col_summary[0]}, mean: {col_summary[1]}, min: {col_summary[2]}, max: {col_summary[3]}, std: {col_summary[4]}")
+    for col, st in stats.items():
+        # describe()'s first five rows (count, null_count, mean, std, min) as Float64, under the labels this report always used
+        col_summary = [as_float(st[key]) for key in ("count", "nulls", "mean", "std", "min")]
+        extra = "".join(f", p{q * 100:g}: {st[f'p{i}']}" for i, q in enumerate(PERCENTILES))
+        print(f"  📊 {col} -> count: {col_summary[0]}, mean: {col_summary[1]}, min: {col_summary[2]}, max: {col_summary[3]}, std: {col_summary[4]}{extra}")
 
-def print_non_numeric_stats(df):
-    if df.is_empty() or not df.columns:
+def print_non_numeric_stats(non_numeric, skip=()):
+    rows, counts = non_numeric
+    counts = {col: vc for col, vc in counts.items() if col not in skip}
+    if not rows or not counts:
         print("  ⚠️ No non-numeric columns found.")
         return
-    for col in df.columns:
-        series = df[col].drop_nulls()
-        if series.is_empty():
+    for col, value_counts in counts.items():
+        if value_counts.is_empty():
             continue
-        value_counts = series.value_counts().sort("count", descending=True)
         top_val = value_counts[0, col]
         freq = value_counts[0, "count"]
-        print(f"  🔠 {col} -> count: {series.len()}, unique: {series.n_unique()}, top: {top_val}, freq: {freq}")
+        print(f"  🔠 {col} -> count: {value_counts['count'].sum()}, unique: {value_counts.height}, top: {top_val}, freq: {freq}")
 
-def print_overall_numeric(values, label=""):
-    if not values:
+def fold_numeric(numeric, acc, skip=()):
+    # Merge each column's collected count/mean/variance/min/max into acc
+    _, stats, values = numeric
+    for col, st in stats.items():
+        if col in skip or not st["count"]:
+            continue
+        is_float = isinstance(st["min"], float) or isinstance(acc.min, float)  # a float anywhere made the combined Series Float64
+        acc.merge(RunningStats.from_moments(st["count"], st["mean"], st["var"] * st["count"], st["min"], st["max"]))
+        if is_float:
+            acc.min, acc.max = float(acc.min), float(acc.max)
+    if acc.sketch is not None and values is not None:
+        for col in values.columns:
+            if col not in skip:
+                acc.sketch.update_many(values[col].drop_nulls().to_list())
+
+def fold_non_numeric(non_numeric, counter, skip=()):
+    for col, value_counts in non_numeric[1].items():
+        if col not in skip:
+            counter.update(dict(value_counts.iter_rows()))
+
+def print_overall_numeric(summary, label=""):
+    if not summary.count:
         print(f"⚠️ No numeric data to summarize for {label}.")
         return
-    s = pl.Series("values", values, strict=False)
+    std = (summary.m2 / (summary.count - 1)) ** 0.5 if summary.count > 1 else float("nan")  # sample std, as Series.std()
     print(f"📊 Overall Numeric Stats ({label}):")
-    print(f"  Count: {s.len()}")
-    print(f"  Nulls: {s.null_count()}")
-    print(f"  Mean: {s.mean():.4f}")
-    print(f"  Std:  {s.std():.4f}")
-    print(f"  Min:  {s.min()}")
-    print(f"  Max:  {s.max()}")
-
-def print_overall_non_numeric(values, label=""):
-    if not values:
-        print(f"⚠️ No non-numeric data to summarize for {label}.")
-        return
-    s = pl.Series("non_numeric", values).drop_nulls()
-    if s.is_empty():
+    print(f"  Count: {summary.count}")
+    print("  Nulls: 0")  # columns are folded in without their nulls
+    print(f"  Mean: {summary.mean:.4f}")
+    print(f"  Std:  {std:.4f}")
+    print(f"  Min:  {summary.min}")
+    print(f"  Max:  {summary.max}")
+    if PERCENTILES:
+        for q, val in zip(PERCENTILES, summary.sketch.quantiles(PERCENTILES)):
+            print(f"  p{q * 100:g}:  {val}")
+
+def print_overall_non_numeric(counter, label=""):
+    if not counter:
         print(f"⚠️ No non-numeric data to summarize for {label}.")
         return
-    vc = s.value_counts().sort("count", descending=True)
-    top_val = vc[0, "non_numeric"]
-    freq = vc[0, "count"]
+    top_val, freq = counter.most_common(1)[0]
     print(f"🔠 Overall Non-Numeric Stats ({label}):")
-    print(f"  Total: {s.len()}, Unique: {s.n_unique()}, Top: {top_val}, Freq: {freq}")
+    print(f"  Total: {sum(counter.values())}, Unique: {len(counter)}, Top: {top_val}, Freq: {freq}")
+
+# === Loader ===
+def load_frame(path):
+    with span("load", file=os.path.basename(path), lazy=LAZY) as sp:
+        try:
+            cached = cached_ipc_path(path, convert=ROW_LIMIT is None) if USE_CACHE else None
+            columns = None if COLUMNS is None else select_columns(read_header(path), COLUMNS, keep=("Facebook_Id", "post_id"))
+            if LAZY:
+                # uncompressed IPC is memory-mapped by scan_ipc
+                lf = pl.scan_ipc(cached, n_rows=ROW_LIMIT) if cached else pl.scan_csv(path, n_rows=ROW_LIMIT)
+                if columns is not None:
+                    lf = lf.select(columns)  # projection pushed into the scan: other columns are never parsed
+                lf.collect_schema()  # fail here, like read_csv, on missing or unreadable files
+                return lf, None  # rows are parsed when the part queries are collected
+            df = pl.read_ipc(cached, n_rows=ROW_LIMIT, columns=columns) if cached else pl.read_csv(path, n_rows=ROW_LIMIT, columns=columns)
+        except Exception as e:
+            return None, e
+        sp.add(rows=df.height, nbytes=os.path.getsize(path) if ROW_LIMIT is None else 0)
+        return df, None
+
+# === Queries ===
+NO_DATA = ((0, {}, None), (0, {}))  # (numeric, non-numeric) summaries of a file that could not be summarised
+IDS = ("Facebook_Id", "post_id")  # left out of Part 1's global stats; the grouped parts leave out their group keys
+
+def global_skip(part):
+    return PART_KEYS[part] or IDS
+
+def numeric_query(lf, cols):
+    # One row: a struct of aggregates per column, so only that row is collected
+    col = pl.col
+    return lf.select([pl.struct(count=col(c).count(), nulls=col(c).null_count(), mean=col(c).mean(), var=col(c).var(ddof=0),
+                                std=col(c).std(), min=col(c).min(), max=col(c).max(),
+                                **{f"p{i}": col(c).quantile(q) for i, q in enumerate(PERCENTILES)}).alias(c) for c in cols])
+
+def as_key(col):
+    # Grouping by a Categorical: the streaming group_by would otherwise keep every parsed chunk its String keys point into
+    return pl.col(col).cast(pl.String).cast(pl.Categorical)
+
+def value_counts_query(lf, col, dtype):
+    if dtype != pl.String:
+        return lf.select(col).drop_nulls().group_by(col).len("count").sort("count", descending=True)
+    return (lf.select(as_key(col)).drop_nulls().group_by(col).len("count")
+            .sort("count", descending=True).with_columns(pl.col(col).cast(pl.String)))
+
+def part_queries(lf, part):
+    # Numeric queries for one part: (row count, aggregates, values for the global sketch or None), or None when its group keys are missing
+    schema = lf.collect_schema()
+    numeric_cols = [col for col, dtype in schema.items() if is_numeric_dtype(dtype)]
+    group_cols = list(PART_KEYS[part])
+    if not all(col in schema for col in group_cols):
+        return None
+    if group_cols:
+        numeric_cols = [col for col in numeric_cols if col not in group_cols]
+        lf = lf.group_by([as_key(col) for col in group_cols]).agg(pl.col(numeric_cols).mean()).select(numeric_cols)
+    values = lf.select([col for col in numeric_cols if col not in global_skip(part)]) if PERCENTILES else None
+    return lf.select(pl.len()), numeric_query(lf, numeric_cols), values
+
+def collect_parts(file_name, df, parts):
+    """Every part's aggregations on one file, collected together: collect_all
+    shares the scans between them, so a LazyFrame's CSV is parsed once for all
+    parts, and only per-column aggregates and value counts are materialised.
+    Returns {part: (numeric, non-numeric) summaries or None}."""
+    lf = df.lazy()
+    schema = lf.collect_schema()
+    non_numeric_cols = [col for col, dtype in schema.items() if not is_numeric_dtype(dtype)]
+    numeric = {part: part_queries(lf, part) for part in parts}
+    queries = [lf.select(pl.len()), *[value_counts_query(lf, col, schema[col]) for col in non_numeric_cols]]
+    queries += [query for triple in numeric.values() if triple is not None for query in triple if query is not None]
+    with span("collect", file=file_name, parts=list(parts)) as sp:
+        results = iter(collect(*queries))
+        rows = next(results).item()
+        non_numeric = (rows, {col: next(results) for col in non_numeric_cols})
+        collected = {}
+        for part, triple in numeric.items():
+            if triple is None:
+                collected[part] = None
+                continue
+            groups, stats, values = [None if query is None else next(results) for query in triple]
+            stats = {col: stats[0, col] for col in stats.columns}
+            collected[part] = ((groups.item(), stats, values), non_numeric)
+        sp.add(rows=rows)
+    return collected
 
 # === Part Processor ===
-def process_file_part(file_name, path, part):
+def process_file_part(file_name, path, part, loaded=None, collected=None):
     print(f"\n==== 📂 File: {file_name} | Part {part} ====")
-    try:
-        df = pl.read_csv(path).head(ROW_LIMIT)
-    except Exception as e:
-        print(f"  ⚠️ Failed to load file: {e}")
-        return [], []
-
-    numeric_cols = [col for col in df.columns if is_numeric_dtype(df[col].dtype)]
-    non_numeric_cols = [col for col in df.columns if not is_numeric_dtype(df[col].dtype)]
+    df, error = loaded if loaded is not None else load_frame(path)
+    if error is not None:
+        print(f"  ⚠️ Failed to load file: {error}")
+        return NO_DATA
+    result = (collected or collect_parts(file_name, df, [part]))[part]
 
     if part == 1:
+        numeric, non_numeric = result
+
         print("\n-- Numeric Stats Per Column --")
-        print_numeric_stats(df.select(numeric_cols))
+        with span("numeric", file=file_name, part=part):
+            print_numeric_stats(numeric)
 
         print("\n-- Non-Numeric Stats Per Column --")
-        print_non_numeric_stats(df.select(non_numeric_cols))
-
-        numeric_vals = [
-            val for col in numeric_cols if col not in ("Facebook_Id", "post_id")
-            for val in df[col].drop_nulls().to_list()
-        ]
-        non_numeric_vals = [
-            val for col in non_numeric_cols if col not in ("Facebook_Id", "post_id")
-            for val in df[col].drop_nulls().to_list()
-        ]
-        return numeric_vals, non_numeric_vals
+        with span("non_numeric", file=file_name, part=part):
+            print_non_numeric_stats(non_numeric)
 
-    # === Grouped by Facebook_Id or (Facebook_Id, post_id)
-    group_cols = []
-    if part == 2:
-        group_cols = ["Facebook_Id"]
-    elif part == 3:
-        group_cols = ["Facebook_Id", "post_id"]
+        return numeric, non_numeric
 
-    if not all(col in df.columns for col in group_cols):
+    # === Grouped by Facebook_Id or (Facebook_Id, post_id)
+    group_cols = list(PART_KEYS[part])
+    if result is None:
         print(f"  ⚠️ Missing required grouping columns: {group_cols}")
-        return [], []
-
-    grouped = df.group_by(group_cols)
-    numeric_grouped = grouped.mean().select([
-        col for col in numeric_cols if col not in group_cols
-    ]) if numeric_cols else pl.DataFrame()
-
-    non_numeric_grouped = []
-    if non_numeric_cols:
-        for _, sub_df in grouped:
-            non_numeric_grouped.append(sub_df.select([
-                col for col in non_numeric_cols if col not in group_cols
-            ]))
-    non_numeric_combined = pl.concat(non_numeric_grouped) if non_numeric_grouped else pl.DataFrame()
+        return NO_DATA
+    numeric_grouped, non_numeric_combined = result
 
     print("\n-- Numeric Stats Per Column (Grouped) --")
-    print_numeric_stats(numeric_grouped)
+    with span("numeric", file=file_name, part=part):
+        print_numeric_stats(numeric_grouped)
 
     print("\n-- Non-Numeric Stats Per Column (Grouped) --")
-    print_non_numeric_stats(non_numeric_combined)
-
-    numeric_vals = [
-        val for col in numeric_grouped.columns
-        for val in numeric_grouped[col].drop_nulls().to_list()
-    ]
-    non_numeric_vals = [
-        val for col in non_numeric_combined.columns
-        for val in non_numeric_combined[col].drop_nulls().to_list()
-    ]
-    return numeric_vals, non_numeric_vals
+    with span("non_numeric", file=file_name, part=part):
+        print_non_numeric_stats(non_numeric_combined, skip=group_cols)
+
+    return numeric_grouped, non_numeric_combined
 
 # === Master Runner ===
-def run_analysis(part, label):
+def new_totals():
+    return RunningStats(QUANTILE_K if PERCENTILES else None), Counter()
+
+def analyze_file(file_name, path, parts, totals):
+    # Every part of one file folded into totals[part], its output held back, so the frame is dropped before the next file is read
+    with span("file", file=file_name):
+        loaded = load_frame(path)
+        collected = collect_parts(file_name, loaded[0], parts) if loaded[1] is None else None
+        reports = {}
+        for part in parts:
+            with capture_output() as out:
+                numeric, non_numeric = process_file_part(file_name, path, part, loaded, collected)
+            fold_numeric(numeric, totals[part][0], skip=global_skip(part))
+            fold_non_numeric(non_numeric, totals[part][1], skip=global_skip(part))
+            reports[part] = out.getvalue()
+        return reports
+
+def run_analysis(part, label, files=None, reports=None, totals=None):
     print(f"\n====================== 📊 PART {part} ANALYSIS ({label}) ======================\n")
-    all_numeric_vals = []
-    all_non_numeric_vals = []
+    all_numeric, all_non_numeric = totals[part] if totals else new_totals()
 
-    for file_name, path in csv_files.items():
-        numeric_vals, non_numeric_vals = process_file_part(file_name, path, part)
-        all_numeric_vals.extend(numeric_vals)
-        all_non_numeric_vals.extend(non_numeric_vals)
+    for file_name, path in (files or csv_files).items():
+        if reports:
+            sys.stdout.write(reports[file_name][part])
+            continue
+        numeric, non_numeric = process_file_part(file_name, path, part)
+        fold_numeric(numeric, all_numeric, skip=global_skip(part))
+        fold_non_numeric(non_numeric, all_non_numeric, skip=global_skip(part))
 
-    print()
-    print_overall_numeric(all_numeric_vals, label)
-    print()
-    print_overall_non_numeric(all_non_numeric_vals, label)
+    with span("global", part=part):
+        print()
+        print_overall_numeric(all_numeric, label)
+        print()
+        print_overall_non_numeric(all_non_numeric, label)
     print()
 
 # === Run All Parts ===
-run_analysis(1, "No Aggregation")
-run_analysis(2, "Grouped by Facebook_Id")
-run_analysis(3, "Grouped by Facebook_Id & post_id")
+PART_LABELS = {1: "No Aggregation", 2: "Grouped by Facebook_Id", 3: "Grouped by Facebook_Id & post_id"}
+
+def main(parts=(1, 2, 3), files=None):
+    files = files or csv_files
+    reports = totals = None
+    if SINGLE_SCAN:
+        # One file at a time: its frame is dropped once every part is summarised, the output is replayed part by part
+        totals = {part: new_totals() for part in parts}
+        reports = {file_name: analyze_file(file_name, path, parts, totals) for file_name, path in files.items()}
+    for part in parts:
+        with span("part", part=part):
+            run_analysis(part, PART_LABELS[part], files, reports, totals)
+
+if __name__ == "__main__":
+    main()
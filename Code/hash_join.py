@@ -0,0 +1,97 @@
+import csv
+from itertools import islice
+
+from accumulators import RunningStats, try_parse_float
+
+JOIN_KEY = "ad_id"
+TOP_GROUPS = 5  # groups listed per join, by their total of the first measure
+
+# === Specs ===
+def main_columns(joins):
+    # Every column a join groups or sums by; the ones an unpacked table lacks come from the main table
+    cols = []
+    for _, group_cols, measures in joins.values():
+        cols.extend(col for col in (*group_cols, *measures) if col != JOIN_KEY and col not in cols)
+    return cols
+
+# === Index ===
+def build_index(path, joins, row_limit=None):
+    """Hash index of the main table: ad_id -> list of records (usually one).
+
+    A record holds only the columns the joins use, measures already parsed to
+    floats, so the streamed tables never re-parse them. Returns (index, the
+    record's column names).
+    """
+    index = {}
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        cols = [col for col in main_columns(joins) if col in (reader.fieldnames or ())]
+        measures = {col for _, _, names in joins.values() for col in names}
+        parse = [col in measures for col in cols]
+        for row in islice(reader, row_limit):
+            record = tuple((try_parse_float(row[col]) if row[col] else None) if numeric else row[col]
+                           for col, numeric in zip(cols, parse))
+            index.setdefault(row[JOIN_KEY], []).append(record)
+    return index, cols
+
+# === Streaming Join ===
+def stream_join(index, index_cols, path, group_cols, measures, row_limit=None):
+    """Inner-join ``path`` to the index on ad_id one row at a time, folding each
+    joined row into per-group sums.
+
+    Columns are read from the streamed row when its table has them, else from
+    the main record. Returns (groups, joined rows, unmatched rows), with
+    ``groups`` mapping the group values to [rows, [sum, count] per measure];
+    None if a column is in neither table.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        header = set(reader.fieldnames or ())
+        if any(col not in header and col not in index_cols for col in (*group_cols, *measures)):
+            return None
+        pos = {col: i for i, col in enumerate(index_cols)}
+        group_src = [(col in header, col if col in header else pos[col]) for col in group_cols]
+        measure_src = [(col in header, col if col in header else pos[col]) for col in measures]
+
+        groups, joined, unmatched = {}, 0, 0
+        for row in islice(reader, row_limit):
+            records = index.get(row[JOIN_KEY])
+            if records is None:
+                unmatched += 1
+                continue
+            for record in records:
+                joined += 1
+                key = tuple(row[src] if from_row else record[src] for from_row, src in group_src)
+                entry = groups.get(key)
+                if entry is None:
+                    entry = groups[key] = [0] + [[0.0, 0] for _ in measures]
+                entry[0] += 1
+                for total, (from_row, src) in zip(entry[1:], measure_src):
+                    if from_row:
+                        val = row[src]
+                        val = try_parse_float(val) if val else None
+                    else:
+                        val = record[src]
+                    if val is not None:
+                        total[0] += val
+                        total[1] += 1
+    return groups, joined, unmatched
+
+# === Output ===
+def print_join(name, table, groups, joined, unmatched, group_cols, measures, main_table="main_ads_cleaned.csv"):
+    print(f"\n==== 🔗 {name}: {table} ⋈ {main_table} on {JOIN_KEY} ====")
+    print(f"  rows joined: {joined}, unmatched: {unmatched}, groups: {len(groups)}")
+    if not groups:
+        print("  ⚠️ No rows matched.")
+        return
+    for i, col in enumerate(measures, 1):
+        totals = RunningStats.from_values(entry[i][0] for entry in groups.values() if entry[i][1])
+        stats = totals.as_dict()
+        print(f"  📊 {col} per group -> count: {stats['count']}, mean: {stats['mean']}, "
+              f"min: {stats['min']}, max: {stats['max']}, std: {stats['std']}")
+    ranked = sorted(groups.items(), key=lambda item: item[1][1][0], reverse=True)[:TOP_GROUPS]
+    print(f"  🔝 Top {len(ranked)} by {measures[0]}:")
+    for key, (rows, *totals) in ranked:
+        label = ", ".join(f"{col}={val}" for col, val in zip(group_cols, key))
+        sums = ", ".join(f"{col}: {total}" for col, (total, _) in zip(measures, totals))
+        print(f"    {label} -> rows: {rows}, {sums}")
@@ -0,0 +1,99 @@
+import ast
+import re
+from functools import lru_cache
+
+# === Configuration ===
+CACHE_SIZE = 65536  # distinct raw strings kept; platform lists and mention lists repeat heavily
+
+# === Tokenizer ===
+# One group, so findall returns plain token strings; any stray character becomes
+# a one-character token that the parser rejects.
+_TOKEN = re.compile(r"""\s*('(?:[^'\\\n]|\\.)*'|"(?:[^"\\\n]|\\.)*"|[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?|True|False|None|\S)""")
+
+_CONSTANTS = {'True': True, 'False': False, 'None': None}
+_NUMBER_START = frozenset('0123456789+-.')
+
+class _Unsupported(Exception):
+    pass
+
+def _scalar(tok):
+    first = tok[0]
+    if first == "'" or first == '"':
+        if len(tok) < 2:
+            raise _Unsupported
+        if '\\' not in tok:
+            return tok[1:-1]
+        try:
+            return ast.literal_eval(tok)
+        except (ValueError, SyntaxError):
+            raise _Unsupported  # bad escape: the whole-text literal_eval below rejects it too
+    if tok in _CONSTANTS:
+        return _CONSTANTS[tok]
+    if first in _NUMBER_START and tok not in ('+', '-', '.'):
+        digits = tok.lstrip('+-')
+        if digits.isdigit():
+            if len(digits) > 1 and digits[0] == '0':
+                raise _Unsupported  # "007" is a SyntaxError for Python; let literal_eval say so
+            return int(tok)
+        return float(tok)
+    raise _Unsupported
+
+def _value(tokens, i):
+    tok = tokens[i]
+    if tok == '[':
+        items, i = [], i + 1
+        while tokens[i] != ']':
+            item, i = _value(tokens, i)
+            items.append(item)
+            if tokens[i] == ',':
+                i += 1
+            elif tokens[i] != ']':
+                raise _Unsupported
+        return items, i + 1
+    if tok == '{':
+        items, i = {}, i + 1
+        while tokens[i] != '}':
+            if tokens[i + 1] != ':':
+                raise _Unsupported
+            key = _scalar(tokens[i])
+            items[key], i = _value(tokens, i + 2)
+            if tokens[i] == ',':
+                i += 1
+            elif tokens[i] != '}':
+                raise _Unsupported
+        return items, i + 1
+    return _scalar(tok), i + 1
+
+def _fast_parse(text):
+    tokens = _TOKEN.findall(text)
+    try:
+        value, end = _value(tokens, 0)
+    except IndexError:
+        raise _Unsupported
+    if end != len(tokens):
+        raise _Unsupported
+    return value
+
+# === Public API ===
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_literal(text):
+    """Parse a dict/list-of-primitives literal as ast.literal_eval would, or return None if malformed.
+
+    Plain str/int/float/bool/None inside lists and dicts take a regex fast path;
+    anything else (tuples, sets, escapes the tokenizer does not cover, syntax
+    errors) is handed to literal_eval. Results are cached by raw string and
+    shared between hits, so treat them as read-only.
+    """
+    if isinstance(text, str):
+        try:
+            return _fast_parse(text)
+        except _Unsupported:
+            pass
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return None
+
+def cache_info():
+    info = parse_literal.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'max_size': info.maxsize}
@@ -0,0 +1,134 @@
+import csv
+import io
+import mmap
+import os
+from multiprocessing import Pool
+
+from accumulators import PartialStats, StringTable
+
+CHUNK_BYTES = 64 * 1024 * 1024
+_QUOTE_BLOCK = 16 * 1024 * 1024
+
+# === Row-Aligned Byte Ranges ===
+def _count_quotes(mm, start, end):
+    return sum(mm[i:min(i + _QUOTE_BLOCK, end)].count(b'"') for i in range(start, end, _QUOTE_BLOCK))
+
+def _row_bounds(mm, start, end, targets):
+    # Advance from each target to the next newline with an even quote count since
+    # ``start`` (itself a row boundary), so no quoted field is split.
+    bounds = []
+    pos, quotes = start, 0
+    for target in targets:
+        if target < pos:
+            continue
+        quotes += _count_quotes(mm, pos, target)
+        pos = target
+        while pos < end:
+            nl = mm.find(b'\n', pos, end)
+            stop = end if nl == -1 else nl + 1
+            quotes += _count_quotes(mm, pos, stop)
+            pos = stop
+            if quotes % 2 == 0:
+                break
+        if not bounds or pos > bounds[-1]:
+            bounds.append(pos)
+    return bounds
+
+def row_aligned_ranges(path, n_chunks):
+    """Split a CSV into (header, [(start, end), ...]) byte ranges on row boundaries.
+
+    A newline ends a row only when the number of quotes before it is even, so
+    multi-line quoted fields (post messages) never straddle two chunks.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return [], []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        bounds = _row_bounds(mm, 0, size, [size * i // n_chunks for i in range(n_chunks)])
+        header = next(csv.reader(io.StringIO(mm[:bounds[0]].decode('utf-8'), newline='')), [])
+    bounds.append(size)
+    ranges = [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+    return header, ranges
+
+def ranges_between(path, start, end, n_chunks):
+    """Split the rows in [start, end) into at most ``n_chunks`` byte ranges; both ends must be row boundaries."""
+    if end <= start:
+        return []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        bounds = [start] + _row_bounds(mm, start, end, [start + (end - start) * i // n_chunks for i in range(1, n_chunks)])
+    bounds.append(end)
+    return [(lo, hi) for lo, hi in zip(bounds, bounds[1:]) if lo < hi]
+
+def complete_rows_end(path, start):
+    """Offset just past the last complete row at or after ``start`` (a row boundary).
+
+    A trailing row with no newline yet, or with an unclosed quote, is left out
+    so a writer that is still appending to the file is not read mid-row.
+    """
+    size = os.path.getsize(path)
+    if size <= start:
+        return start
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        quotes, end = _count_quotes(mm, start, size), size
+        while True:
+            nl = mm.rfind(b'\n', start, end)
+            if nl == -1:
+                return start
+            quotes -= _count_quotes(mm, nl + 1, end)
+            if quotes % 2 == 0:
+                return nl + 1
+            end = nl
+
+# === Workers ===
+def split_rows(data):
+    """Field lists for the CSV rows in ``data`` (bytes), blank lines skipped.
+
+    A chunk with no quote character at all (most of the unpacked tables) is
+    split on newlines and commas directly; anything else goes through csv.reader.
+    """
+    text = data.decode('utf-8')
+    if b'"' in data:
+        return filter(None, csv.reader(io.StringIO(text, newline='')))
+    return (line.rstrip('\r').split(',') for line in text.split('\n') if line.rstrip('\r'))
+
+def _scan_range(task):
+    path, start, end, header, numeric_cols, non_numeric_cols, groupings, partial_kwargs = task
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    # A fresh id table per chunk: a forked worker would otherwise inherit, and pickle back, every id of the run
+    ids = StringTable()
+    partials = {name: PartialStats(numeric_cols, non_numeric_cols, key_cols, id_table=ids, **partial_kwargs).bind(header)
+                for name, key_cols in groupings.items()}
+    for row in split_rows(data):
+        for partial in partials.values():
+            partial.add_fields(row)
+    return partials
+
+def parallel_scan(path, numeric_cols, non_numeric_cols, groupings, workers=None, **partial_kwargs):
+    """Scan ``path`` across a process pool, one PartialStats per ``groupings`` entry.
+
+    ``groupings`` maps a name (e.g. the part number) to its key columns, so a
+    single pass over the file can feed Parts 1-3 at once. Extra keyword
+    arguments (counter_factory, stats_factory) are passed to every PartialStats.
+    """
+    workers = workers or os.cpu_count() or 1
+    n_chunks = max(workers, os.path.getsize(path) // CHUNK_BYTES + 1)
+    header, ranges = row_aligned_ranges(path, n_chunks)
+    return scan_ranges(path, header, ranges, numeric_cols, non_numeric_cols, groupings, workers, **partial_kwargs)
+
+def scan_ranges(path, header, ranges, numeric_cols, non_numeric_cols, groupings, workers=1, **partial_kwargs):
+    tasks = [(path, start, end, header, numeric_cols, non_numeric_cols, groupings, partial_kwargs) for start, end in ranges]
+    ids = StringTable()  # only this file's ids, so a checkpointed result does not carry the rest of the run's
+    result = {name: PartialStats(numeric_cols, non_numeric_cols, key_cols, id_table=ids, **partial_kwargs) for name, key_cols in groupings.items()}
+    if workers <= 1 or len(tasks) <= 1:
+        return _merge_into(result, map(_scan_range, tasks))
+    with Pool(min(workers, len(tasks))) as pool:
+        # imap keeps chunk order, so merged counters break ties like a sequential scan
+        return _merge_into(result, pool.imap(_scan_range, tasks))
+
+def _merge_into(result, scanned):
+    for partials in scanned:
+        for name, partial in partials.items():
+            result[name].merge(partial)
+    return result
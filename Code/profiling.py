@@ -0,0 +1,168 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ENV_VAR = "STATS_PROFILE"  # e.g. STATS_PROFILE=profile.json python "fb ads/pandas_stats.py"
+ENV_TRACE_MEMORY = "STATS_TRACE_MEMORY"  # set to 1 to add tracemalloc peaks (slows Python-heavy code a lot)
+
+ENABLED = False
+_events = []
+_output = None
+_owner_pid = None
+_origin = time.perf_counter()
+
+# === Spans ===
+class _NullSpan:
+    # Shared by every span() call while profiling is off: no clock reads, no allocation
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, rows=0, nbytes=0):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ("name", "args", "rows", "nbytes", "start", "print_start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.rows = 0
+        self.nbytes = 0
+
+    def __enter__(self):
+        self.print_start = _print_seconds()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        dur = end - self.start
+        args = dict(self.args)
+        if self.rows:
+            args["rows"] = self.rows
+            args["rows_per_s"] = self.rows / dur if dur > 0 else None
+        if self.nbytes:
+            args["bytes"] = self.nbytes
+            args["bytes_per_s"] = self.nbytes / dur if dur > 0 else None
+        print_s = _print_seconds() - self.print_start
+        if print_s:
+            args["print_s"] = print_s
+        args.update(memory_snapshot())
+        _events.append({
+            "name": self.name, "ts": (self.start - _origin) * 1e6, "dur": dur * 1e6,
+            "pid": os.getpid(), "tid": threading.get_ident(), "args": args,
+        })
+        return False
+
+    def add(self, rows=0, nbytes=0):
+        # Throughput counters: rows parsed and bytes read inside this span
+        self.rows += rows
+        self.nbytes += nbytes or 0
+
+def span(name, **args):
+    """Time a phase: ``with span("load", file=name) as sp: ...; sp.add(rows=n)``.
+
+    Returns a shared no-op context manager unless profiling is enabled.
+    """
+    if not ENABLED:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+# === Memory ===
+def memory_snapshot():
+    snapshot = {}
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        snapshot["peak_rss_bytes"] = peak if sys.platform == "darwin" else peak * 1024
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot["traced_bytes"] = current
+        snapshot["traced_peak_bytes"] = peak
+    return snapshot
+
+# === Print Timing ===
+class _TimedStream:
+    # Wraps sys.stdout so each span can report how long its output took to write
+    def __init__(self, stream):
+        self._stream = stream
+        self.seconds = 0.0
+
+    def write(self, text):
+        start = time.perf_counter()
+        try:
+            return self._stream.write(text)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+def _print_seconds():
+    return sys.stdout.seconds if isinstance(sys.stdout, _TimedStream) else 0.0
+
+# === Setup / Export ===
+def enable(output=None, trace_memory=False):
+    global ENABLED, _output, _owner_pid
+    ENABLED = True
+    _output = output
+    _owner_pid = os.getpid()
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if not isinstance(sys.stdout, _TimedStream):
+        sys.stdout = _TimedStream(sys.stdout)
+
+def write(path=None):
+    """Save the recorded spans: ``.jsonl`` gets one JSON object per span, anything
+    else a Chrome trace (open it in chrome://tracing or ui.perfetto.dev)."""
+    path = path or _output
+    if not path or os.getpid() != _owner_pid:
+        return
+    events = sorted(_events, key=lambda e: e["ts"])
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+        else:
+            json.dump({"traceEvents": [dict(event, ph="X", cat="stats") for event in events],
+                       "displayTimeUnit": "ms"}, f)
+
+# === Worker Processes ===
+def worker_state():
+    # What a worker process needs to record spans on the owner's clock; None while profiling is off
+    return (tracemalloc.is_tracing(), _origin) if ENABLED else None
+
+def start_worker(state):
+    global _origin
+    del _events[:]  # a forked worker starts with a copy of the owner's spans
+    if state is not None:
+        trace_memory, _origin = state
+        enable(trace_memory=trace_memory)
+
+def take_events():
+    # The spans recorded since the last call, for a worker to send back with its result
+    events = _events[:]
+    del _events[:]
+    return events
+
+def add_events(events):
+    _events.extend(events)
+
+if os.environ.get(ENV_VAR):
+    enable(os.environ[ENV_VAR], os.environ.get(ENV_TRACE_MEMORY) == "1")
+    atexit.register(write)
@@ -0,0 +1,148 @@
+import math
+import random
+from collections import Counter, defaultdict
+from statistics import NormalDist
+
+from accumulators import RunningStats, try_parse_float
+
+# === Reservoir ===
+class Reservoir:
+    """Uniform sample of ``k`` items from a stream of unknown length (Algorithm L).
+
+    One pass, O(k) memory. Once the reservoir is full, the position of the next
+    item to take in is drawn ahead, so every other item costs one comparison.
+    """
+
+    __slots__ = ("k", "items", "seen", "_rng", "_w", "_next")
+
+    def __init__(self, k, rng):
+        self.k = k
+        self.items = []
+        self.seen = 0
+        self._rng = rng
+        self._w = math.exp(math.log(self._uniform()) / k)
+        self._next = k + self._skip()
+
+    def _uniform(self):
+        # In (0, 1): both ends would make a log below blow up
+        u = self._rng.random()
+        while u == 0.0:
+            u = self._rng.random()
+        return u
+
+    def _skip(self):
+        return int(math.log(self._uniform()) / math.log1p(-self._w)) + 1
+
+    def add(self, item):
+        self.seen += 1
+        if len(self.items) < self.k:
+            self.items.append(item)
+        elif self.seen == self._next:
+            self.items[self._rng.randrange(self.k)] = item
+            self._w *= math.exp(math.log(self._uniform()) / self.k)
+            self._next += self._skip()
+
+# === Sampling ===
+_POOLED = object()  # report() key for the strata too thin in the sample to stand alone
+
+class Sample:
+    """``k`` rows drawn uniformly from the whole stream, plus the row count of
+    every ``key`` stratum when one is given. Memory is k rows however many
+    strata the stream holds.
+
+    A uniform sample is proportionally allocated in expectation (each stratum
+    gets about k x its share of the rows), so every sampled row stands for the
+    same number of rows and stats over ``rows()`` need no reweighting; the
+    stratum counts let ``report`` post-stratify the means with the exact sizes.
+    """
+
+    def __init__(self, k, key=None, seed=None):
+        self.k = k
+        self.key = key
+        self.reservoir = Reservoir(k, random.Random(seed))
+        self.strata = Counter()  # stratum -> rows seen
+
+    @property
+    def seen(self):
+        return self.reservoir.seen
+
+    def add(self, row):
+        if self.key:
+            self.strata[self.key(row)] += 1
+        self.reservoir.add(row)
+
+    def rows(self):
+        return iter(self.reservoir.items)
+
+    def report(self, header, columns, confidence=0.95):
+        """Sample size and, per numeric column, the estimated whole-file mean with
+        its ``confidence`` interval: ``{col: (mean, low, high, values sampled)}``.
+
+        Each stratum's sample mean is weighted by the stratum's share of the rows
+        read, with the stratified variance sum(W_h^2 (1 - n_h/N_h) s_h^2 / n_h);
+        without strata that is the simple random sample interval. Strata with
+        fewer than two sampled rows (most of them none) are pooled into one: the
+        sampled rows that fall in it are still a uniform sample of its rows.
+        """
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        pos = {col: i for i, col in enumerate(header)}
+        by_stratum = defaultdict(list)
+        for row in self.reservoir.items:
+            by_stratum[self.key(row) if self.key else None].append(row)
+        if self.key:
+            sizes = {stratum: self.strata[stratum] for stratum, rows in by_stratum.items() if len(rows) >= 2}
+            pooled = [row for stratum, rows in by_stratum.items() if stratum not in sizes for row in rows]
+            if pooled:
+                sizes[_POOLED] = self.seen - sum(sizes.values())
+                by_stratum = {stratum: by_stratum[stratum] for stratum in sizes if stratum is not _POOLED}
+                by_stratum[_POOLED] = pooled
+        else:
+            sizes = {None: self.seen}
+        means = {}
+        for col in columns:
+            i = pos.get(col)
+            if i is None:
+                continue
+            parts = []
+            for stratum, rows in by_stratum.items():
+                acc = RunningStats.from_values(val for val in (try_parse_float(row[i]) for row in rows if i < len(row) and row[i])
+                                               if val is not None)
+                if acc.count:
+                    parts.append((sizes[stratum], acc))
+            if not parts:
+                continue
+            total = sum(seen for seen, _ in parts)
+            mean = var = 0.0
+            for seen, acc in parts:
+                weight = seen / total
+                mean += weight * acc.mean
+                if acc.count > 1:
+                    var += weight * weight * (1 - acc.count / seen) * (acc.m2 / (acc.count - 1)) / acc.count
+            half = z * math.sqrt(max(var, 0.0))
+            means[col] = (mean, mean - half, mean + half, sum(acc.count for _, acc in parts))
+        return {'sampled': len(self.reservoir.items), 'seen': self.seen, 'strata': len(self.strata) or 1, 'confidence': confidence, 'means': means}
+
+def draw_sample(rows, k, header=None, strata_col=None, seed=None):
+    """One streaming pass over csv.reader ``rows``: a uniform sample of ``k`` rows,
+    with the rows of every ``strata_col`` value counted when that is given."""
+    key = None
+    if strata_col is not None:
+        if strata_col not in header:
+            raise ValueError(f"no {strata_col!r} column to stratify the sample by")
+        i = header.index(strata_col)
+        key = lambda row: row[i] if i < len(row) else None
+    sample = Sample(k, key, seed)
+    for row in rows:
+        sample.add(row)
+    return sample
+
+# === Output ===
+def print_sample_report(report):
+    strata = f" across {report['strata']} strata" if report['strata'] > 1 else ""
+    weighted = ", post-stratified" if report['strata'] > 1 else ""
+    print(f"\n-- Sample: {report['sampled']} of {report['seen']} rows{strata}; "
+          f"estimated whole-file means ({report['confidence']:.0%} CI{weighted}) --")
+    if not report['means']:
+        print("  ⚠️ No numeric values sampled.")
+    for col, (mean, low, high, n) in report['means'].items():
+        print(f"  📏 {col} -> mean: {mean}, CI: [{low}, {high}], values sampled: {n}")
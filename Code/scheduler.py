@@ -0,0 +1,119 @@
+import contextlib
+import importlib.util
+import io
+import os
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import profiling
+
+ROW_BYTES_GUESS = 1024  # bytes per row assumed when a row-limited read only touches the start of a file
+
+# === Output Capture ===
+class _ThreadRoutedStream:
+    # Stands in for sys.stdout: a thread inside capture_output() writes to its own buffer, others pass through
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self._local, "buffer", None)
+        return (self._stream if buffer is None else buffer).write(text)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+_route_lock = threading.Lock()
+
+def _router():
+    with _route_lock:
+        if not isinstance(sys.stdout, _ThreadRoutedStream):
+            sys.stdout = _ThreadRoutedStream(sys.stdout)
+        return sys.stdout
+
+@contextlib.contextmanager
+def capture_output():
+    """Collect what the current thread prints into a StringIO (safe to use from several threads at once)."""
+    router = _router()
+    buffer = io.StringIO()
+    router._local.buffer = buffer
+    try:
+        yield buffer
+    finally:
+        router._local.buffer = None
+
+# === Process Workers ===
+_worker_task = None
+
+def _init_worker(module_name, module_path, func_name, settings, profile_state):
+    # Forked workers already hold the script; spawned ones load it by path and reapply its settings
+    global _worker_task
+    profiling.start_worker(profile_state)
+    module = sys.modules.get(module_name)
+    if module is None or getattr(module, func_name, None) is None:
+        spec = importlib.util.spec_from_file_location(module_name, module_path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+        vars(module).update(settings)
+    _worker_task = getattr(module, func_name)
+
+def _call_worker_task(*args):
+    # The task's spans travel back with its result: only the owner process writes the profile
+    return _worker_task(*args), profiling.take_events()
+
+# === Scheduler ===
+def memory_estimate(path, per_byte, row_limit=None):
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    if row_limit is not None:
+        size = min(size, row_limit * ROW_BYTES_GUESS)
+    return size * per_byte
+
+def run_files(task, files, args=(), workers=None, threads=False, cost=None, budget=None):
+    """Run ``task(file_name, path, *args)`` for every file concurrently and return
+    ``{file_name: result}`` in the order of ``files``.
+
+    Files are started largest first so the longest job is never left for last.
+    With ``budget`` set, a file only starts while the ``cost(path)`` of the
+    running files plus its own fits in it; the largest file that fits goes
+    next, and a file too big for the budget still runs once nothing else does.
+    ``threads`` uses a thread pool (for libraries that release the GIL);
+    otherwise tasks run in processes, with the task's module settings (its
+    UPPER_CASE globals) carried over to spawned workers.
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(files)))
+    sizes = {name: os.path.getsize(path) if os.path.exists(path) else 0 for name, path in files.items()}
+    costs = {name: cost(path) if cost else sizes[name] for name, path in files.items()}
+    pending = sorted(files, key=sizes.get, reverse=True)
+
+    if threads:
+        _router()  # install before the workers start printing
+        pool = ThreadPoolExecutor(workers)
+        submit = lambda name: pool.submit(task, name, files[name], *args)
+    else:
+        module = sys.modules[task.__module__]
+        settings = {key: val for key, val in vars(module).items() if key.isupper()}
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                   initargs=(task.__module__, module.__file__, task.__name__, settings, profiling.worker_state()))
+        submit = lambda name: pool.submit(_call_worker_task, name, files[name], *args)
+
+    results, running, in_use = {}, {}, 0
+    with pool:
+        while pending or running:
+            while pending and len(running) < workers:
+                fits = [name for name in pending if budget is None or not running or in_use + costs[name] <= budget]
+                if not fits:
+                    break
+                pending.remove(fits[0])
+                running[submit(fits[0])] = fits[0]
+                in_use += costs[fits[0]]
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                in_use -= costs[name]
+                results[name] = future.result()
+                if not threads:
+                    results[name], events = results[name]
+                    profiling.add_events(events)
+    return {name: results[name] for name in files}
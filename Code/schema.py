@@ -0,0 +1,114 @@
+import json
+import os
+import re
+from itertools import islice
+
+SCHEMA_VERSION = 2
+NUMERIC_SHARE = 0.8  # a column is numeric when this share of its sampled values parse as numbers
+
+# === Value Recognition ===
+# What float() accepts (bar exotic unicode digits), checked without raising
+_NUMBER = re.compile(r"\s*[+-]?(?:(?:\d(?:_?\d)*)?\.?\d(?:_?\d)*(?:[eE][+-]?\d(?:_?\d)*)?|\d(?:_?\d)*\.(?:[eE][+-]?\d(?:_?\d)*)?|nan|inf(?:inity)?)\s*", re.IGNORECASE)
+_DATETIME = re.compile(r"\s*\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?\s*(?:Z|[+-]\d{2}:?\d{2}|[A-Z]{2,4})?)?\s*")
+_TOKEN_ID = re.compile(r"[0-9A-Fa-f]{16,}|[0-9]{12,}")
+_ID_NAME = re.compile(r"(?:^|_)(?:id|Id|ID)$|[a-z]Id$|^url$")
+
+def looks_numeric(val):
+    return _NUMBER.fullmatch(val) is not None
+
+# === Inference ===
+def _classify(col, samples):
+    numeric = sum(1 for val in samples if looks_numeric(val)) >= NUMERIC_SHARE * len(samples)
+    unique = len(set(samples))
+    if _ID_NAME.search(col) or (unique == len(samples) > 1 and all(_TOKEN_ID.fullmatch(val) for val in samples)):
+        kind = "id"
+    elif numeric:
+        kind = "numeric"
+    elif sum(1 for val in samples if _DATETIME.fullmatch(val)) >= NUMERIC_SHARE * len(samples):
+        kind = "datetime"
+    elif unique > len(samples) / 2 and sum(map(len, samples)) / len(samples) >= 20:
+        kind = "text"
+    else:
+        kind = "categorical"
+    return {"kind": kind, "numeric": numeric}
+
+def infer_schema(header, sample_rows, sample_size):
+    """Classify each column from the sampled rows as numeric / categorical / text / datetime / id.
+
+    ``numeric`` keeps the scripts' routing rule (80% of the non-empty samples
+    parse as numbers) independently of the kind, so a numeric id column is
+    still summarised like before. Columns with no values in the sample are left
+    out, as detect_column_types did.
+    """
+    col_samples = {col: [] for col in header}
+    for row in sample_rows:
+        for col, val in zip(header, row):
+            if val is None:
+                continue
+            val = val.strip()
+            if val:
+                col_samples.setdefault(col, []).append(val)
+    columns = {col: _classify(col, samples) for col, samples in col_samples.items() if samples}
+    return {"version": SCHEMA_VERSION, "header": list(header), "sample_size": sample_size, "columns": columns}
+
+def split_columns(schema):
+    columns = schema["columns"]
+    numeric_cols = [col for col, info in columns.items() if info["numeric"]]
+    non_numeric_cols = [col for col, info in columns.items() if not info["numeric"]]
+    return numeric_cols, non_numeric_cols
+
+def text_columns(schema, columns):
+    # The free-text ones among ``columns``, for a TextProfile instead of a value count
+    kinds = schema["columns"]
+    return [col for col in columns if col in kinds and kinds[col]["kind"] == "text"]
+
+# === Sidecar ===
+def sidecar_path(path):
+    return path + ".schema.json"
+
+def source_stamp(path):
+    # Size + mtime of the CSV: a file rewritten under the same header gets inferred again
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def load_schema(path, header, sample_size=None):
+    # sample_size=None accepts a sidecar inferred from any sample size
+    try:
+        with open(sidecar_path(path), encoding="utf-8") as f:
+            schema = json.load(f)
+        stamp = source_stamp(path)
+    except (OSError, ValueError):
+        return None
+    if schema.get("source") != stamp:
+        return None
+    if schema.get("version") != SCHEMA_VERSION or schema.get("header") != list(header):
+        return None
+    if sample_size is not None and schema.get("sample_size") != sample_size:
+        return None
+    return schema
+
+def save_schema(path, schema):
+    try:
+        with open(sidecar_path(path), "w", encoding="utf-8") as f:
+            json.dump(schema, f, indent=2)
+    except OSError:
+        pass  # read-only data folder: infer again next time
+
+def resolve_schema(path, header, rows, sample_size):
+    """Return (schema, rows already consumed) for csv.reader ``rows`` of ``path`` after ``header``.
+
+    A sidecar written by an earlier run with the same header, for a file of the
+    same size and mtime, is used as is and nothing is consumed. Otherwise the
+    first ``sample_size + 1`` rows are taken from ``rows`` (the same stream the
+    scan goes on to read), classified and saved next to the CSV; the caller
+    feeds them to the scan before the rest.
+    """
+    schema = load_schema(path, header, sample_size)
+    if schema is not None:
+        return schema, []
+    stamp = source_stamp(path)
+    sample = list(islice(rows, sample_size + 1))
+    schema = infer_schema(header, sample, sample_size)
+    schema["source"] = stamp
+    save_schema(path, schema)
+    return schema, sample
@@ -0,0 +1,314 @@
+import hashlib
+import heapq
+import math
+import random
+from array import array
+
+# === Hashing ===
+def hash64(value):
+    # Stable across processes (unlike hash()), so sketches from pool workers merge
+    return int.from_bytes(hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'little')
+
+# === Distinct Count ===
+class HyperLogLog:
+    """Distinct-count sketch with relative standard error ~1.04 / sqrt(2 ** precision)."""
+
+    def __init__(self, precision=12):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    @classmethod
+    def for_error(cls, relative_error):
+        precision = math.ceil(math.log2((1.04 / relative_error) ** 2))
+        return cls(min(max(precision, 4), 18))
+
+    def add_hash(self, h):
+        tail_bits = 64 - self.precision
+        idx = h >> tail_bits
+        rank = tail_bits - (h & ((1 << tail_bits) - 1)).bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def add(self, value):
+        self.add_hash(hash64(value))
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("cannot merge HyperLogLog sketches with different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)
+        return raw
+
+# === Heavy Hitters ===
+class SpaceSaving:
+    """Top-k counter (Space-Saving over a stream-summary).
+
+    Each value's count overestimates its true frequency by at most its
+    ``errors`` entry, itself at most total / capacity, so count - error is a
+    guaranteed lower bound. Values are kept in buckets by count with a lazy
+    min-heap of the bucket counts, so an eviction costs O(log buckets) rather
+    than a scan over every counter.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self._buckets = {}  # count -> {value: None}, in arrival order
+        self._heap = []  # bucket counts; stale entries are skipped on the way out
+
+    @classmethod
+    def for_error(cls, relative_error):
+        return cls(math.ceil(1 / relative_error))
+
+    def _floor(self):
+        return self._min_count() if len(self.counts) >= self.capacity else 0
+
+    def _min_count(self):
+        heap, buckets = self._heap, self._buckets
+        while heap[0] not in buckets:
+            heapq.heappop(heap)
+        return heap[0]
+
+    def _place(self, value, count):
+        self.counts[value] = count
+        bucket = self._buckets.get(count)
+        if bucket is None:
+            bucket = self._buckets[count] = {}
+            heapq.heappush(self._heap, count)
+            if len(self._heap) > 4 * self.capacity:
+                self._heap = list(self._buckets)
+                heapq.heapify(self._heap)
+        bucket[value] = None
+
+    def _unplace(self, value):
+        count = self.counts.pop(value)
+        bucket = self._buckets[count]
+        del bucket[value]
+        if not bucket:
+            del self._buckets[count]
+        return count
+
+    def add(self, value, weight=1):
+        if value in self.counts:
+            self._place(value, self._unplace(value) + weight)
+        elif len(self.counts) < self.capacity:
+            self.errors[value] = 0
+            self._place(value, weight)
+        else:
+            victim = next(iter(self._buckets[self._min_count()]))
+            floor = self._unplace(victim)
+            del self.errors[victim]
+            self.errors[value] = floor
+            self._place(value, floor + weight)
+
+    def merge(self, other):
+        floor, other_floor = self._floor(), other._floor()
+        merged = {value: (count + other.counts.get(value, other_floor), self.errors[value] + other.errors.get(value, other_floor))
+                  for value, count in self.counts.items()}
+        for value, count in other.counts.items():
+            if value not in merged:
+                merged[value] = (count + floor, other.errors[value] + floor)
+        kept = sorted(merged.items(), key=lambda item: item[1][0], reverse=True)[:self.capacity]
+        self.counts, self.errors, self._buckets, self._heap = {}, {}, {}, []
+        for value, (count, error) in kept:
+            self.errors[value] = error
+            self._place(value, count)
+        return self
+
+    def top(self):
+        # (value, guaranteed count): the value seen most often for sure, with the lower bound on its frequency
+        if not self.counts:
+            return None, 0
+        value = max(self.counts, key=lambda val: (self.counts[val] - self.errors[val], self.counts[val]))
+        return value, self.counts[value] - self.errors[value]
+
+class TermCounter:
+    """Top terms of a token stream in fixed memory.
+
+    Counts go to a Count-Min sketch over the tokens' hash64 values (each
+    estimate overcounts by at most ~e * total / width with high probability);
+    the only strings kept are the ``top_n`` heaviest tokens seen so far.
+    """
+
+    def __init__(self, top_n=10, width=2 ** 14, depth=4):
+        self.top_n = top_n
+        self.width = width
+        self.depth = depth
+        self.table = array('Q', bytes(8 * width * depth))
+        self.total = 0
+        self.candidates = {}  # token -> estimated count
+        self._floor = 0  # lower bound on the smallest candidate count
+
+    def _cells(self, token):
+        h = hash64(token)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def estimate(self, token):
+        table = self.table
+        return min(table[cell] for cell in self._cells(token))
+
+    def add(self, token):
+        self.total += 1
+        table = self.table
+        est = None
+        for cell in self._cells(token):
+            table[cell] += 1
+            if est is None or table[cell] < est:
+                est = table[cell]
+        self._offer(token, est)
+
+    def _offer(self, token, est):
+        candidates = self.candidates
+        if token in candidates or len(candidates) < self.top_n:
+            candidates[token] = est
+        elif est > self._floor:
+            victim = min(candidates, key=candidates.__getitem__)
+            self._floor = candidates[victim]
+            if est > self._floor:
+                del candidates[victim]
+                candidates[token] = est
+
+    def merge(self, other):
+        table = self.table
+        for i, count in enumerate(other.table):
+            if count:
+                table[i] += count
+        self.total += other.total
+        tokens = set(self.candidates) | set(other.candidates)
+        ranked = sorted(((-self.estimate(token), token) for token in tokens))[:self.top_n]
+        self.candidates = {token: -est for est, token in ranked}
+        self._floor = min(self.candidates.values(), default=0)
+        return self
+
+    def top(self):
+        # Ties by token, so merged partials list them as a serial scan does
+        return sorted(self.candidates.items(), key=lambda item: (-item[1], item[0]))
+
+# === Quantiles ===
+class KLLSketch:
+    """Mergeable quantile sketch (Karnin-Lang-Liberty); rank error shrinks roughly as 1 / k."""
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.count = 0
+        self.compactors = [[]]
+        self.size = 0
+        self.max_size = self._capacity(0)
+        self._rng = random.Random(seed)
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return math.ceil(self.k * (2 / 3) ** depth) + 1
+
+    def _grow(self):
+        self.compactors.append([])
+        self.max_size = sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def _compress(self):
+        for level in range(len(self.compactors)):
+            if len(self.compactors[level]) >= self._capacity(level):
+                if level + 1 >= len(self.compactors):
+                    self._grow()
+                items = sorted(self.compactors[level])
+                odd = len(items) % 2
+                # keep every other item (random phase); the weight of survivors doubles
+                self.compactors[level + 1].extend(items[odd + (self._rng.random() < 0.5)::2])
+                self.compactors[level] = items[:odd]
+                self.size = sum(map(len, self.compactors))
+                if self.size < self.max_size:
+                    break
+
+    def update(self, x):
+        self.compactors[0].append(x)
+        self.count += 1
+        self.size += 1
+        if self.size >= self.max_size:
+            self._compress()
+
+    def update_many(self, values):
+        before = len(self.compactors[0])
+        self.compactors[0].extend(values)
+        added = len(self.compactors[0]) - before
+        self.count += added
+        self.size += added
+        while self.size >= self.max_size:
+            self._compress()
+
+    def merge(self, other):
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.count += other.count
+        self.size = sum(map(len, self.compactors))
+        while self.size >= self.max_size:
+            self._compress()
+        return self
+
+    def quantiles(self, qs):
+        weighted = sorted((x, 1 << level) for level, items in enumerate(self.compactors) for x in items)
+        if not weighted:
+            return [None for _ in qs]
+        total = sum(weight for _, weight in weighted)
+        results = []
+        for q in qs:
+            target, running = q * total, 0
+            for x, weight in weighted:
+                running += weight
+                if running >= target:
+                    break
+            results.append(x)
+        return results
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+
+# === Approximate Value Counter ===
+class ApproxCounter:
+    """Fixed-size stand-in for Counter: exact total, HLL unique, Space-Saving top/freq.
+
+    Per column it holds 2 ** precision one-byte HLL registers (4 KB at
+    unique_error=0.02) plus ceil(1 / top_error) monitored values with their
+    counts and errors (100 at top_error=0.01), so beyond those 100 values
+    themselves it stays a few KB whatever the cardinality. A value Space-Saving
+    is monitoring is already in the HLL registers, so only the others are hashed.
+    """
+
+    def __init__(self, unique_error=0.02, top_error=0.01):
+        self.total = 0
+        self.distinct = HyperLogLog.for_error(unique_error)
+        self.heavy = SpaceSaving.for_error(top_error)
+
+    def __bool__(self):
+        return self.total > 0
+
+    def add(self, value):
+        self.total += 1
+        if value not in self.heavy.counts:
+            self.distinct.add(value)
+        self.heavy.add(value)
+
+    def update(self, other):
+        self.total += other.total
+        self.distinct.merge(other.distinct)
+        self.heavy.merge(other.heavy)
+        return self
+
+    def summary(self):
+        if not self.total:
+            return None
+        top_val, freq = self.heavy.top()
+        unique = min(round(self.distinct.estimate()), self.total)
+        return {'count': self.total, 'unique': unique, 'top': top_val, 'freq': freq}
@@ -1,9 +1,23 @@
+import os
+import sys
 import pandas as pd
 from collections import Counter
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from accumulators import RunningStats
+from chunked_scan import fold_into, print_counter_stats, print_moment_stats, scan_chunks
+from columns import read_header, select_columns
+from csv_cache import cached_ipc_path, read_cached_table
+from profiling import span
+
 # === Configuration ===
 file_path = r"C:\Users\puroh\OneDrive\Documents\Syracuse\RA\Task_03_Descriptive_Stats\Data\2024_tw_posts_president_scored_anon.csv"
 ROW_LIMIT = 500
+COLUMNS = None  # columns to read: None for all, a columns.PRESETS name (e.g. "tw-posts") or {"include": [...], "exclude": [...], "pattern": regex, "exclude_pattern": regex}
+CHUNK_ROWS = None  # e.g. 200_000: read_csv in chunks of this many rows folded into mergeable stats, so the whole file (ROW_LIMIT = None) runs in fixed memory; percentiles become KLL estimates
+USE_CACHE = False  # convert each CSV to a memory-mapped Arrow IPC cache on first read (needs pyarrow); row-limited runs only reuse an existing cache
+PERCENTILES = ()  # e.g. (0.5, 0.95): adds percentiles to the numeric stats
+QUANTILE_K = 200  # KLL sketch size behind the global percentiles (per-column ones stay exact)
 
 # === Helpers ===
 def print_numeric_stats(df):
@@ -11,8 +25,10 @@ def print_numeric_stats(df):
         print("  ⚠️ No numeric columns found.")
         return
     desc = df.describe().T
+    quantiles = df.quantile(list(PERCENTILES)) if PERCENTILES else None
     for col, row in desc.iterrows():
-        print(f"  📊 {col} -> count: {int(row['count'])}, mean: {row['mean']}, min: {row['min']}, max: {row['max']}, std: {row['std']}")
+        extra = "".join(f", p{q * 100:g}: {quantiles.at[q, col]}" for q in PERCENTILES)
+        print(f"  📊 {col} -> count: {int(row['count'])}, mean: {row['mean']}, min: {row['min']}, max: {row['max']}, std: {row['std']}{extra}")
 
 def print_non_numeric_stats(df):
     if df.empty or df.shape[1] == 0:
@@ -27,50 +43,103 @@ def print_non_numeric_stats(df):
         freq = counter.max()
         print(f"  🔠 {col} -> count: {series.count()}, unique: {series.nunique()}, top: {top_val}, freq: {freq}")
 
-def print_overall_stats(series, is_numeric):
-    series = pd.Series(series).dropna()
-    if series.empty:
+def fold_numeric(df, acc):
+    # Merge each column's count/mean/variance/min/max into acc instead of copying its values out
+    if df.shape[1] == 0:
+        return
+    counts, means, variances, mins, maxs = df.count(), df.mean(), df.var(ddof=0), df.min(), df.max()
+    for col in df.columns:
+        n = int(counts[col])
+        if n:
+            acc.merge(RunningStats.from_moments(n, float(means[col]), float(variances[col]) * n, float(mins[col]), float(maxs[col])))
+            if acc.sketch is not None:
+                acc.sketch.update_many(df[col].dropna().tolist())
+
+def fold_non_numeric(df, counter):
+    for col in df.columns:
+        # sort=False keeps first-appearance order, so ties resolve as they did on the concatenated values
+        counter.update(df[col].value_counts(sort=False).to_dict())
+
+def print_overall_stats(summary, is_numeric):
+    if (summary.count if is_numeric else len(summary)) == 0:
         print("  ⚠️ No data for global statistics.")
         return
     if is_numeric:
-        stats = series.describe()
-        print(f"  📉 Global ➡️ Overall Numeric Stats:\n  count: {int(stats['count'])}\n  mean: {stats['mean']}\n  min: {stats['min']}\n  max: {stats['max']}\n  std: {stats['std']}")
+        std = (summary.m2 / (summary.count - 1)) ** 0.5 if summary.count > 1 else float('nan')  # sample std, as describe()
+        quantiles = summary.sketch.quantiles(PERCENTILES) if PERCENTILES else []
+        extra = "".join(f"\n  p{q * 100:g}: {val}" for q, val in zip(PERCENTILES, quantiles))
+        print(f"  📉 Global ➡️ Overall Numeric Stats:\n  count: {summary.count}\n  mean: {summary.mean}\n  min: {summary.min}\n  max: {summary.max}\n  std: {std}{extra}")
     else:
-        counter = series.value_counts()
-        print(f"  📝 Global ➡️ Overall Non-Numeric Stats:\n  total entries: {series.count()}\n  unique values: {series.nunique()}\n  top: {counter.idxmax()}\n  freq: {counter.max()}")
+        top, freq = summary.most_common(1)[0]
+        print(f"  📝 Global ➡️ Overall Non-Numeric Stats:\n  total entries: {sum(summary.values())}\n  unique values: {len(summary)}\n  top: {top}\n  freq: {freq}")
 
 # === PART 1 Runner ===
-def run_part_1():
+def run_chunked_part_1(file_name, state):
+    # CHUNK_ROWS: per-column stats folded during the chunked read, printed like the frame path below
+    print("\n-- Numeric Stats Per Column --")
+    with span("numeric", file=file_name, part=1):
+        print_moment_stats(state['numeric'], PERCENTILES)
+
+    print("\n-- Non-Numeric Stats Per Column --")
+    with span("non_numeric", file=file_name, part=1):
+        print_counter_stats(state['non_numeric'])
+
+    with span("global", part=1):
+        all_numeric = RunningStats(QUANTILE_K if PERCENTILES else None)
+        all_non_numeric = Counter()
+        fold_into(state['numeric'], state['non_numeric'], all_numeric, all_non_numeric, skip=("Facebook_Id", "post_id"))
+
+        print(f"\n====================== 🌍 Overall Global Stats ======================")
+        print_overall_stats(all_numeric, is_numeric=True)
+        print_overall_stats(all_non_numeric, is_numeric=False)
+
+def run_part_1(path=None):
+    path = path or file_path
     print(f"\n====================== 📊 PART 1 ANALYSIS (Twitter Posts) ======================\n")
-    try:
-        df = pd.read_csv(file_path, nrows=ROW_LIMIT)
-    except Exception as e:
-        print(f"  ⚠️ Failed to load file: {e}")
-        return
+    file_name = os.path.basename(path)
+    with span("load", file=file_name, chunked=bool(CHUNK_ROWS)) as sp:
+        try:
+            columns = None if COLUMNS is None else select_columns(read_header(path), COLUMNS)
+            if CHUNK_ROWS:
+                states, rows = scan_chunks(path, {1: ()}, CHUNK_ROWS, ROW_LIMIT, columns, QUANTILE_K if PERCENTILES else None)
+                sp.add(rows=rows, nbytes=os.path.getsize(path) if ROW_LIMIT is None else 0)
+                run_chunked_part_1(file_name, states[1])
+                return
+            cached = cached_ipc_path(path, convert=ROW_LIMIT is None) if USE_CACHE else None
+            if cached:
+                df = read_cached_table(cached, ROW_LIMIT, columns).to_pandas(types_mapper=pd.ArrowDtype)
+            else:
+                df = pd.read_csv(path, nrows=ROW_LIMIT, usecols=columns)
+        except Exception as e:
+            print(f"  ⚠️ Failed to load file: {e}")
+            return
+        sp.add(rows=len(df), nbytes=os.path.getsize(path) if ROW_LIMIT is None else 0)
 
     numeric_cols = df.select_dtypes(include='number').columns.tolist()
     non_numeric_cols = df.select_dtypes(exclude='number').columns.tolist()
 
     print("\n-- Numeric Stats Per Column --")
-    print_numeric_stats(df[numeric_cols])
+    with span("numeric", file=file_name, part=1):
+        print_numeric_stats(df[numeric_cols])
 
     print("\n-- Non-Numeric Stats Per Column --")
-    print_non_numeric_stats(df[non_numeric_cols])
+    with span("non_numeric", file=file_name, part=1):
+        print_non_numeric_stats(df[non_numeric_cols])
 
-    all_numeric_vals = []
-    all_non_numeric_vals = []
+    with span("global", part=1):
+        all_numeric = RunningStats(QUANTILE_K if PERCENTILES else None)
+        all_non_numeric = Counter()
 
-    for col in numeric_cols:
-        if col not in ("Facebook_Id", "post_id"):
-            all_numeric_vals.extend(df[col].dropna().tolist())
+        fold_numeric(df[numeric_cols].drop(columns=["Facebook_Id", "post_id"], errors='ignore'), all_numeric)
+        fold_non_numeric(df[non_numeric_cols].drop(columns=["Facebook_Id", "post_id"], errors='ignore'), all_non_numeric)
 
-    for col in non_numeric_cols:
-        if col not in ("Facebook_Id", "post_id"):
-            all_non_numeric_vals.extend(df[col].dropna().tolist())
-
-    print(f"\n====================== 🌍 Overall Global Stats ======================")
-    print_overall_stats(all_numeric_vals, is_numeric=True)
-    print_overall_stats(all_non_numeric_vals, is_numeric=False)
+        print(f"\n====================== 🌍 Overall Global Stats ======================")
+        print_overall_stats(all_numeric, is_numeric=True)
+        print_overall_stats(all_non_numeric, is_numeric=False)
 
 # === Run Part 1 Only ===
-run_part_1()
+def main(parts=(1,), files=None):
+    run_part_1(next(iter(files.values())) if files else None)
+
+if __name__ == "__main__":
+    main()
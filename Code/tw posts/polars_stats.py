@@ -1,68 +1,133 @@
-import pandas as pd
+import os
+import sys
+import polars as pl
 from collections import Counter
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from accumulators import RunningStats
+from columns import read_header, select_columns
+from csv_cache import cached_ipc_path
+from profiling import span
+
 # === Configuration ===
 csv_path = r"C:\Users\puroh\OneDrive\Documents\Syracuse\RA\Task_03_Descriptive_Stats\Data\2024_tw_posts_president_scored_anon.csv"
 ROW_LIMIT = 500
+COLUMNS = None  # columns to read: None for all, a columns.PRESETS name (e.g. "tw-posts") or {"include": [...], "exclude": [...], "pattern": regex, "exclude_pattern": regex}
+USE_CACHE = False  # convert each CSV to a memory-mapped Arrow IPC cache on first read (needs pyarrow); row-limited runs only reuse an existing cache
+PERCENTILES = ()  # e.g. (0.5, 0.95): adds percentiles to the numeric stats (the global ones also collect the numeric columns for the sketch)
+QUANTILE_K = 200  # KLL sketch size behind the global percentiles (per-column ones stay exact)
+ENGINE = "streaming"  # Polars engine used to collect the query plans
+IDS = ("Facebook_Id", "post_id")  # left out of the global stats
+
+# === Queries ===
+def numeric_query(lf, cols):
+    # One row: a struct of aggregates per column, so only that row is collected
+    col = pl.col
+    return lf.select([pl.struct(count=col(c).count(), mean=col(c).mean(), var=col(c).var(ddof=0), std=col(c).std(),
+                                min=col(c).min(), max=col(c).max(),
+                                **{f"p{i}": col(c).quantile(q) for i, q in enumerate(PERCENTILES)}).alias(c) for c in cols])
+
+def value_counts_query(lf, col):
+    # Counted as a Categorical: the streaming group_by would otherwise keep every parsed chunk its String keys point into
+    return (lf.select(pl.col(col).cast(pl.String).cast(pl.Categorical)).drop_nulls().group_by(col).len("count")
+            .sort("count", descending=True).with_columns(pl.col(col).cast(pl.String)))
 
-# === Load Data ===
-try:
-    df = pd.read_csv(csv_path, nrows=ROW_LIMIT)
-except Exception as e:
-    print(f"⚠️ Failed to load CSV: {e}")
-    df = pd.DataFrame()
+# === PART 1 Runner ===
+def run_part_1(path=None):
+    path = path or csv_path
+    file_name = os.path.basename(path)
 
-if df.empty:
-    print("⚠️ No data loaded.")
-else:
-    numeric_cols = df.select_dtypes(include='number').columns.tolist()
-    non_numeric_cols = df.select_dtypes(exclude='number').columns.tolist()
+    # === Load Data ===
+    with span("load", file=file_name) as sp:
+        try:
+            cached = cached_ipc_path(path, convert=ROW_LIMIT is None) if USE_CACHE else None
+            lf = pl.scan_ipc(cached, n_rows=ROW_LIMIT) if cached else pl.scan_csv(path, n_rows=ROW_LIMIT)
+            if COLUMNS is not None:
+                lf = lf.select(select_columns(read_header(path), COLUMNS))  # pushed into the scan
+            schema = lf.collect_schema()
+            numeric_cols = [col for col, dtype in schema.items() if dtype.is_numeric()]
+            non_numeric_cols = [col for col, dtype in schema.items() if not dtype.is_numeric()]
+            # Only aggregates and value counts are collected, sharing one scan
+            queries = [lf.select(pl.len()), numeric_query(lf, numeric_cols), *[value_counts_query(lf, col) for col in non_numeric_cols]]
+            if PERCENTILES:
+                queries.append(lf.select([col for col in numeric_cols if col not in IDS]))
+            results = pl.collect_all(queries, engine=ENGINE)
+            rows = results[0].item() if schema else 0
+            stats = {col: results[1][0, col] for col in numeric_cols}
+            counts = dict(zip(non_numeric_cols, results[2:2 + len(non_numeric_cols)]))
+            values = results[-1] if PERCENTILES else None
+            sp.add(rows=rows, nbytes=os.path.getsize(path) if ROW_LIMIT is None else 0)
+        except Exception as e:
+            print(f"⚠️ Failed to load CSV: {e}")
+            numeric_cols, non_numeric_cols = [], []
+            rows, stats, counts, values = 0, {}, {}, None
 
-    print("\n-- Numeric Stats Per Column --")
-    if not numeric_cols:
-        print("  ⚠️ No numeric columns found.")
+    if rows == 0:
+        print("⚠️ No data loaded.")
     else:
-        desc = df[numeric_cols].describe().T
-        for col in numeric_cols:
-            row = desc.loc[col]
-            print(f"  📊 {col} -> count: {int(row['count'])}, mean: {row['mean']:.4f}, min: {row['min']}, max: {row['max']}, std: {row['std']:.4f}")
+        print("\n-- Numeric Stats Per Column --")
+        with span("numeric", file=file_name, part=1):
+            if not numeric_cols:
+                print("  ⚠️ No numeric columns found.")
+            else:
+                for col in numeric_cols:
+                    st = stats[col]
+                    extra = "".join(f", p{q * 100:g}: {st[f'p{i}']}" for i, q in enumerate(PERCENTILES))
+                    print(f"  📊 {col} -> count: {st['count']}, mean: {st['mean']:.4f}, min: {st['min']}, max: {st['max']}, std: {st['std']:.4f}{extra}")
 
-    print("\n-- Non-Numeric Stats Per Column --")
-    for col in non_numeric_cols:
-        series = df[col].dropna().astype(str)
-        if series.empty:
-            continue
-        counts = series.value_counts()
-        top_val = counts.index[0]
-        freq = counts.iloc[0]
-        print(f"  🔠 {col} -> count: {len(series)}, unique: {series.nunique()}, top: {top_val}, freq: {freq}")
+        print("\n-- Non-Numeric Stats Per Column --")
+        with span("non_numeric", file=file_name, part=1):
+            for col in non_numeric_cols:
+                value_counts = counts[col]
+                if value_counts.is_empty():
+                    continue
+                top_val = value_counts[0, col]
+                freq = value_counts[0, "count"]
+                print(f"  🔠 {col} -> count: {value_counts['count'].sum()}, unique: {value_counts.height}, top: {top_val}, freq: {freq}")
 
-    # === Overall stats (excluding Facebook_Id and post_id) ===
-    print("\n====================== 🌍 Overall Global Stats ======================")
-    numeric_vals = []
-    for col in numeric_cols:
-        if col not in ("Facebook_Id", "post_id"):
-            numeric_vals.extend(df[col].dropna().tolist())
+        # === Overall stats (excluding Facebook_Id and post_id) ===
+        with span("global", part=1):
+            print("\n====================== 🌍 Overall Global Stats ======================")
+            numeric = RunningStats(QUANTILE_K if PERCENTILES else None)
+            for col in numeric_cols:
+                if col in IDS:
+                    continue
+                # merge each column's summary instead of concatenating every value
+                st = stats[col]
+                n = st["count"]
+                if n:
+                    numeric.merge(RunningStats.from_moments(n, st["mean"], st["var"] * n, float(st["min"]), float(st["max"])))
+            if numeric.sketch is not None and values is not None:
+                for col in values.columns:
+                    numeric.sketch.update_many(values[col].drop_nulls().to_list())
+            if numeric.count:
+                std = (numeric.m2 / (numeric.count - 1)) ** 0.5 if numeric.count > 1 else float("nan")
+                print("\n📉 Overall Numeric Stats (excluding IDs):")
+                print(f"  Count: {numeric.count}")
+                print(f"  Mean: {numeric.mean:.4f}")
+                print(f"  Std:  {std:.4f}")
+                print(f"  Min:  {numeric.min}")
+                print(f"  Max:  {numeric.max}")
+                if PERCENTILES:
+                    for q, val in zip(PERCENTILES, numeric.sketch.quantiles(PERCENTILES)):
+                        print(f"  p{q * 100:g}:  {val}")
+            else:
+                print("\n⚠️ No overall numeric values to summarize.")
 
-    non_numeric_vals = []
-    for col in non_numeric_cols:
-        if col not in ("Facebook_Id", "post_id"):
-            non_numeric_vals.extend(df[col].dropna().astype(str).tolist())
+            counter = Counter()
+            for col in non_numeric_cols:
+                if col not in IDS:
+                    counter.update(dict(counts[col].iter_rows()))
+            if counter:
+                top_val, freq = counter.most_common(1)[0]
+                print("\n📝 Overall Non-Numeric Stats (excluding IDs):")
+                print(f"  Total: {sum(counter.values())}, Unique: {len(counter)}, Top: {top_val}, Freq: {freq}")
+            else:
+                print("\n⚠️ No overall non-numeric values to summarize.")
 
-    if numeric_vals:
-        s = pd.Series(numeric_vals)
-        print("\n📉 Overall Numeric Stats (excluding IDs):")
-        print(f"  Count: {s.count()}")
-        print(f"  Mean: {s.mean():.4f}")
-        print(f"  Std:  {s.std():.4f}")
-        print(f"  Min:  {s.min()}")
-        print(f"  Max:  {s.max()}")
-    else:
-        print("\n⚠️ No overall numeric values to summarize.")
+# === Run Part 1 Only ===
+def main(parts=(1,), files=None):
+    run_part_1(next(iter(files.values())) if files else None)
 
-    if non_numeric_vals:
-        vc = pd.Series(non_numeric_vals).value_counts()
-        print("\n📝 Overall Non-Numeric Stats (excluding IDs):")
-        print(f"  Total: {vc.sum()}, Unique: {vc.count()}, Top: {vc.index[0]}, Freq: {vc.iloc[0]}")
-    else:
-        print("\n⚠️ No overall non-numeric values to summarize.")
+if __name__ == "__main__":
+    main()
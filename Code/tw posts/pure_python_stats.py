@@ -1,103 +1,175 @@
 import csv
-from collections import defaultdict, Counter
-from itertools import islice
+import os
+import sys
+from collections import Counter
+from functools import partial as bind
+from itertools import chain, islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from accumulators import EncodedValues, NumericBuffer, PartialStats, RunningStats, TextProfile, counter_summary, percentile_text
+from checkpoint import incremental_scan
+from columns import select_columns
+from parallel_scan import parallel_scan
+from profiling import span
+from sampling import draw_sample, print_sample_report
+from schema import resolve_schema, split_columns, text_columns
+from sketches import ApproxCounter
 
 # === Configuration ===
 csv_file = r"C:\Users\puroh\OneDrive\Documents\Syracuse\RA\Task_03_Descriptive_Stats\Data\2024_tw_posts_president_scored_anon.csv"
-ROW_LIMIT = 500
+ROW_LIMIT = 500  # None streams the whole file; memory stays O(columns)
+COLUMNS = None  # columns to read: None for all, a columns.PRESETS name (e.g. "tw-posts") or {"include": [...], "exclude": [...], "pattern": regex, "exclude_pattern": regex}
+WORKERS = os.cpu_count() or 1  # full-file scans (ROW_LIMIT = None) are split across this many processes
+APPROXIMATE = False  # HyperLogLog unique + Space-Saving top/freq: fixed memory per non-numeric column
+UNIQUE_ERROR = 0.02  # HyperLogLog relative standard error
+TOP_ERROR = 0.01  # Space-Saving error: freq is a guaranteed lower bound, at most this share of the column's count under the true one
+PERCENTILES = ()  # e.g. (0.5, 0.95): adds streaming KLL-sketch percentiles to the numeric stats
+QUANTILE_K = 200  # KLL sketch size; rank error shrinks roughly as 1 / QUANTILE_K
+EXACT_VALUES = False  # keep raw values (array('d') numbers, array('I')-coded strings) for exact percentiles
+SAMPLE_SIZE = 100  # rows used to infer the schema; saved next to each CSV as <file>.schema.json and reused
+STATE_DIR = None  # e.g. "stats_state": with ROW_LIMIT = None, checkpoint each file's stats there and only parse rows appended since the last run
+SAMPLING = None  # "reservoir": Parts see a uniform SAMPLE_ROWS-row sample of the whole file instead of its first ROW_LIMIT rows; "stratified": the same sample with its means post-stratified by SAMPLE_STRATA
+SAMPLE_ROWS = 500  # total sample size; memory stays SAMPLE_ROWS rows however long the file and however many strata
+SAMPLE_STRATA = None  # column to stratify by (e.g. "Page Category")
+SAMPLE_SEED = 0  # same file and seed, same sample
+CONFIDENCE = 0.95  # level of the intervals on the sampled whole-file means
+TEXT_PROFILE = False  # free-text columns (schema kind "text": text, ...) get length / empty-rate / top-term profiles instead of value counts, keeping no raw strings
+TOP_TERMS = 10  # terms listed per text column
+TERM_WIDTH = 2 ** 14  # Count-Min sketch width behind the term counts; memory is 4 x TERM_WIDTH x 8 bytes per column
 
 # === Helpers ===
-def try_parse_float(val):
-    try:
-        return float(val)
-    except:
-        return None
+def value_counter_factory():
+    if APPROXIMATE:
+        return bind(ApproxCounter, UNIQUE_ERROR, TOP_ERROR)
+    return EncodedValues if EXACT_VALUES else Counter
+
+def numeric_stats_factory():
+    if EXACT_VALUES:
+        return NumericBuffer
+    return bind(RunningStats, QUANTILE_K) if PERCENTILES else RunningStats
+
+def scan_options(schema, non_numeric_cols):
+    # (non-numeric columns, PartialStats keyword arguments): with TEXT_PROFILE the free-text columns move to text_cols
+    text_cols = text_columns(schema, non_numeric_cols) if TEXT_PROFILE else []
+    options = dict(counter_factory=value_counter_factory(), stats_factory=numeric_stats_factory())
+    if text_cols:
+        options.update(text_cols=text_cols, text_factory=bind(TextProfile, TOP_TERMS, TERM_WIDTH))
+    return [col for col in non_numeric_cols if col not in text_cols], options
 
 def compute_basic_stats(values):
-    if not values:
-        return {'count': 0, 'mean': None, 'min': None, 'max': None, 'std': None}
-    count = len(values)
-    mean = sum(values) / count
-    std = (sum((x - mean) ** 2 for x in values) / count) ** 0.5 if count > 1 else 0
-    return {'count': count, 'mean': mean, 'min': min(values), 'max': max(values), 'std': std}
-
-def detect_column_types(path, sample_size=100):
-    numeric_cols, non_numeric_cols = set(), set()
-    with open(path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        col_samples = defaultdict(list)
-        for i, row in enumerate(reader):
-            for col, val in row.items():
-                val = val.strip()
-                if val:
-                    col_samples[col].append(val)
-            if i >= sample_size:
-                break
-    for col, samples in col_samples.items():
-        numeric_count = sum(1 for val in samples if try_parse_float(val) is not None)
-        if numeric_count >= 0.8 * len(samples):
-            numeric_cols.add(col)
-        else:
-            non_numeric_cols.add(col)
-    return list(numeric_cols), list(non_numeric_cols)
+    if not isinstance(values, (RunningStats, NumericBuffer)):
+        values = RunningStats.from_values(values)
+    return values.as_dict(PERCENTILES)
 
 def print_column_stats(stats_dict, is_numeric):
     for col, values in stats_dict.items():
         if is_numeric:
             stats = compute_basic_stats(values)
-            print(f"  📊 {col} -> count: {stats['count']}, mean: {stats['mean']}, min: {stats['min']}, max: {stats['max']}, std: {stats['std']}")
+            print(f"  📊 {col} -> count: {stats['count']}, mean: {stats['mean']}, min: {stats['min']}, max: {stats['max']}, std: {stats['std']}{percentile_text(stats)}")
         else:
-            if not values:
+            summary = counter_summary(values)
+            if summary is None:
                 continue
-            counter = Counter(values)
-            top_val, freq = counter.most_common(1)[0]
-            print(f"  🔠 {col} -> count: {len(values)}, unique: {len(counter)}, top: {top_val}, freq: {freq}")
+            print(f"  🔠 {col} -> count: {summary['count']}, unique: {summary['unique']}, top: {summary['top']}, freq: {summary['freq']}")
 
 def print_overall_stats(all_values, is_numeric):
     if is_numeric:
         stats = compute_basic_stats(all_values)
-        print(f"  📉 Global ➡️ Overall Numeric Stats:\n  count: {stats['count']}\n  mean: {stats['mean']}\n  min: {stats['min']}\n  max: {stats['max']}\n  std: {stats['std']}")
+        print(f"  📉 Global ➡️ Overall Numeric Stats:\n  count: {stats['count']}\n  mean: {stats['mean']}\n  min: {stats['min']}\n  max: {stats['max']}\n  std: {stats['std']}{percentile_text(stats, multiline=True)}")
     else:
-        if not all_values:
+        summary = counter_summary(all_values)
+        if summary is None:
             return
-        counter = Counter(all_values)
-        top_val, freq = counter.most_common(1)[0]
-        print(f"  📝 Global ➡️ Overall Non-Numeric Stats:\n  total entries: {len(all_values)}\n  unique values: {len(counter)}\n  top: {top_val}\n  freq: {freq}")
-
-# === Main Execution (Part 1 only) ===
-print(f"\n==== 📂 File: 2024_tw_posts_president_scored_anon.csv | Part 1 ====")
-numeric_cols, non_numeric_cols = detect_column_types(csv_file)
-numeric_data = defaultdict(list)
-non_numeric_data = defaultdict(list)
-
-with open(csv_file, 'r', encoding='utf-8') as f:
-    reader = csv.DictReader(f)
-    for row in islice(reader, ROW_LIMIT):
-        for col in numeric_cols:
-            val = try_parse_float(row.get(col))
-            if val is not None:
-                numeric_data[col].append(val)
-        for col in non_numeric_cols:
-            val = row.get(col, "").strip()
-            if val:
-                non_numeric_data[col].append(val)
-
-print("\n-- Numeric Stats Per Column --")
-print_column_stats(numeric_data, is_numeric=True)
-
-print("\n-- Non-Numeric Stats Per Column --")
-print_column_stats(non_numeric_data, is_numeric=False)
-
-print(f"\n====================== 🌍 Overall Global Stats ======================")
-all_numeric_vals = []
-for col, vals in numeric_data.items():
-    if col not in ("Facebook_Id", "post_id"):
-        all_numeric_vals.extend(vals)
-
-all_non_numeric_vals = []
-for col, vals in non_numeric_data.items():
-    if col not in ("Facebook_Id", "post_id"):
-        all_non_numeric_vals.extend(vals)
-
-print_overall_stats(all_numeric_vals, is_numeric=True)
-print_overall_stats(all_non_numeric_vals, is_numeric=False)
+        print(f"  📝 Global ➡️ Overall Non-Numeric Stats:\n  total entries: {summary['count']}\n  unique values: {summary['unique']}\n  top: {summary['top']}\n  freq: {summary['freq']}")
+
+def print_text_profiles(profiles):
+    for col, profile in profiles.items():
+        summary = profile.summary()
+        length = summary['length']
+        terms = ", ".join(f"{term} ({count})" for term, count in summary['terms']) or "-"
+        print(f"  ✍️ {col} -> rows: {summary['rows']}, empty: {summary['empty_rate']:.1%}, "
+              f"length: mean {length['mean']}, min {length['min']}, max {length['max']}, std {length['std']}, top terms: {terms}")
+
+# === Sampler ===
+def sampled_scan(path, header, rows, numeric_cols, non_numeric_cols, groupings, options):
+    # SAMPLING: every part sees one sample of the whole file; each partial also carries the whole-file mean estimates
+    if SAMPLING not in ("reservoir", "stratified") or (SAMPLING == "stratified" and not SAMPLE_STRATA):
+        raise ValueError(f"SAMPLING must be None, 'reservoir' or 'stratified' (with SAMPLE_STRATA set), not {SAMPLING!r}")
+    with span("sample", file=os.path.basename(path), method=SAMPLING) as sp:
+        drawn = draw_sample(rows, SAMPLE_ROWS, header, SAMPLE_STRATA if SAMPLING == "stratified" else None, SAMPLE_SEED)
+        sp.add(rows=drawn.seen, nbytes=os.path.getsize(path))
+    partials = {part: PartialStats(numeric_cols, non_numeric_cols, key_cols, **options).bind(header) for part, key_cols in groupings.items()}
+    for row in drawn.rows():
+        for partial in partials.values():
+            partial.add_fields(row)
+    report = drawn.report(header, numeric_cols, CONFIDENCE)
+    for partial in partials.values():
+        partial.sample_report = report
+    return partials
+
+# === PART 1 Runner ===
+def run_part_1(path=None):
+    path = path or csv_file
+    print(f"\n==== 📂 File: 2024_tw_posts_president_scored_anon.csv | Part 1 ====")
+    file_name = os.path.basename(path)
+    with span("scan", file=file_name, parts=[1]) as sp:
+        with open(path, 'r', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            rows = islice(filter(None, reader), None if SAMPLING else ROW_LIMIT)  # blank lines skipped, as DictReader did
+            with span("schema", file=file_name):
+                schema, sample = resolve_schema(path, header, rows, SAMPLE_SIZE)
+            numeric_cols, non_numeric_cols = split_columns(schema)
+            numeric_cols, non_numeric_cols = select_columns(numeric_cols, COLUMNS), select_columns(non_numeric_cols, COLUMNS)
+            non_numeric_cols, options = scan_options(schema, non_numeric_cols)
+            if SAMPLING:
+                partial = sampled_scan(path, header, chain(sample, rows), numeric_cols, non_numeric_cols, {1: ()}, options)[1]
+            elif STATE_DIR and ROW_LIMIT is None:
+                partial = incremental_scan(path, STATE_DIR, numeric_cols, non_numeric_cols, {1: ()}, WORKERS, **options)[1]
+            elif ROW_LIMIT is not None or WORKERS <= 1:
+                partial = PartialStats(numeric_cols, non_numeric_cols, **options).bind(header)
+                n_rows = 0
+                for n_rows, row in enumerate(chain(sample, rows), 1):
+                    partial.add_fields(row)
+                sp.add(rows=n_rows)
+        if ROW_LIMIT is None and WORKERS > 1 and not STATE_DIR and not SAMPLING:
+            partial = parallel_scan(path, numeric_cols, non_numeric_cols, {1: ()}, WORKERS, **options)[1]
+        if ROW_LIMIT is None and not SAMPLING:
+            sp.add(nbytes=os.path.getsize(path))
+    numeric_data, non_numeric_data = partial.numeric, partial.non_numeric
+
+    print("\n-- Numeric Stats Per Column --")
+    with span("numeric", file=file_name, part=1):
+        print_column_stats(numeric_data, is_numeric=True)
+    if SAMPLING:
+        print_sample_report(partial.sample_report)
+
+    print("\n-- Non-Numeric Stats Per Column --")
+    with span("non_numeric", file=file_name, part=1):
+        print_column_stats(non_numeric_data, is_numeric=False)
+    if partial.text:
+        print("\n-- Text Profile Per Column --")
+        with span("text", file=file_name, part=1):
+            print_text_profiles(partial.text)
+
+    print(f"\n====================== 🌍 Overall Global Stats ======================")
+    with span("global", part=1):
+        all_numeric_vals = numeric_stats_factory()()
+        for col, acc in numeric_data.items():
+            if col not in ("Facebook_Id", "post_id"):
+                all_numeric_vals.merge(acc)
+
+        all_non_numeric_vals = value_counter_factory()()
+        for col, counter in non_numeric_data.items():
+            if col not in ("Facebook_Id", "post_id"):
+                all_non_numeric_vals.update(counter)
+
+        print_overall_stats(all_numeric_vals, is_numeric=True)
+        print_overall_stats(all_non_numeric_vals, is_numeric=False)
+
+# === Run Part 1 Only ===
+def main(parts=(1,), files=None):
+    run_part_1(next(iter(files.values())) if files else None)
+
+if __name__ == "__main__":
+    main()
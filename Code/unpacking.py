@@ -0,0 +1,131 @@
+import argparse
+import os
+from collections import Counter, deque
+from multiprocessing import Pool
+
+import pandas as pd
+
+from literal_parser import cache_info, parse_literal
+
+# === Configuration ===
+RAW_CSV = r"C:\Users\puroh\OneDrive\Documents\Syracuse\RA\Task_03_Descriptive_Stats\Data\2024_fb_ads_president_scored_anon.csv"
+CHUNK_ROWS = 50_000  # raw rows per chunk handed to a worker
+WORKERS = os.cpu_count() or 1
+IN_FLIGHT_PER_WORKER = 2  # chunks read ahead per worker: bounds the raw rows held while the workers parse
+
+NESTED_COLUMNS = ['delivery_by_region', 'demographic_distribution', 'publisher_platforms', 'illuminating_mentions']
+MAIN_FILE = 'main_ads_cleaned.csv'
+TABLES = {
+    'unpacked_delivery_by_region.csv': ['ad_id', 'page_id', 'region', 'region_spend', 'region_impressions'],
+    'unpacked_demographics.csv': ['ad_id', 'page_id', 'gender', 'age_range', 'demo_spend', 'demo_impressions'],
+    'unpacked_platforms.csv': ['ad_id', 'page_id', 'platform'],
+    'unpacked_mentions.csv': ['ad_id', 'page_id', 'mention'],
+}
+
+# === Unpacking ===
+def unpack_columns(columns):
+    """Unpack one chunk of the four nested columns in a single pass.
+
+    ``columns`` maps 'ad_id', 'page_id' and each of NESTED_COLUMNS to a list of
+    raw values. Rows are appended to flat per-column lists (one dict per output
+    table, keyed like TABLES) instead of building a DataFrame per row. Malformed
+    fields parse to None and contribute nothing. Also returns this chunk's parse
+    cache hits/misses.
+    """
+    before = cache_info()
+    region, demo, platform, mention = ({col: [] for col in cols} for cols in TABLES.values())
+    rows = zip(columns['ad_id'], columns['page_id'], *(columns[col] for col in NESTED_COLUMNS))
+    for ad_id, page_id, delivery_raw, demo_raw, platforms_raw, mentions_raw in rows:
+        delivery = parse_literal(delivery_raw)
+        if delivery:
+            for name, stats in delivery.items():
+                region['ad_id'].append(ad_id)
+                region['page_id'].append(page_id)
+                region['region'].append(name)
+                region['region_spend'].append(stats.get('spend', None))
+                region['region_impressions'].append(stats.get('impressions', None))
+
+        groups = parse_literal(demo_raw)
+        if groups:
+            for demo_group, stats in groups.items():
+                if '_' in demo_group:
+                    gender, age_range = demo_group.split('_', 1)
+                else:
+                    gender, age_range = 'unknown', demo_group
+                demo['ad_id'].append(ad_id)
+                demo['page_id'].append(page_id)
+                demo['gender'].append(gender)
+                demo['age_range'].append(age_range)
+                demo['demo_spend'].append(stats.get('spend', None))
+                demo['demo_impressions'].append(stats.get('impressions', None))
+
+        for values, table, col in ((parse_literal(platforms_raw), platform, 'platform'),
+                                   (parse_literal(mentions_raw), mention, 'mention')):
+            if values:
+                table['ad_id'].extend([ad_id] * len(values))
+                table['page_id'].extend([page_id] * len(values))
+                table[col].extend(values)
+    after = cache_info()
+    parse_counts = {key: after[key] - before[key] for key in ('hits', 'misses')}
+    return (region, demo, platform, mention), parse_counts
+
+def _chunk_columns(chunk):
+    return {col: chunk[col].tolist() for col in ['ad_id', 'page_id', *NESTED_COLUMNS]}
+
+def unpack_file(raw_csv=RAW_CSV, output_dir='.', chunk_rows=CHUNK_ROWS, workers=WORKERS):
+    """Read the raw ads CSV once and write main_ads_cleaned.csv plus the four unpacked tables.
+
+    Chunks are parsed across ``workers`` processes, at most
+    IN_FLIGHT_PER_WORKER * workers at a time, and appended in file order. An
+    input without data rows still gets every output file, header only.
+    Returns ({file name: output path}, parse cache hit/miss totals across workers).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {name: os.path.join(output_dir, name) for name in [MAIN_FILE, *TABLES]}
+    parse_counts = Counter()
+    written = 0
+
+    def write(main, tables, counts):
+        nonlocal written
+        parse_counts.update(counts)
+        mode, header = ('w', True) if written == 0 else ('a', False)
+        main.to_csv(paths[MAIN_FILE], mode=mode, header=header, index=False)
+        for name, table in zip(TABLES, tables):
+            pd.DataFrame(table, columns=TABLES[name]).to_csv(paths[name], mode=mode, header=header, index=False)
+        written += 1
+
+    # Raw text in, raw text out: per-chunk dtype inference would format the same column differently across chunks
+    read = lambda **kwargs: pd.read_csv(raw_csv, dtype=str, keep_default_na=False, **kwargs)
+    pool = Pool(workers) if workers > 1 else None
+    in_flight = deque()  # (main_ads rows, pending unpack) in file order
+    try:
+        for chunk in read(chunksize=chunk_rows):
+            main = chunk.drop(columns=NESTED_COLUMNS)
+            if pool is None:
+                write(main, *unpack_columns(_chunk_columns(chunk)))
+                continue
+            in_flight.append((main, pool.apply_async(unpack_columns, (_chunk_columns(chunk),))))
+            if len(in_flight) >= IN_FLIGHT_PER_WORKER * workers:
+                main, pending = in_flight.popleft()
+                write(main, *pending.get())
+        while in_flight:
+            main, pending = in_flight.popleft()
+            write(main, *pending.get())
+        if not written:
+            write(read(nrows=0).drop(columns=NESTED_COLUMNS), [{col: [] for col in cols} for cols in TABLES.values()], {})
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return paths, dict(parse_counts)
+
+# === Entry Point ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Unpack the nested columns of the raw Facebook ads CSV.")
+    parser.add_argument('raw_csv', nargs='?', default=RAW_CSV)
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    args = parser.parse_args()
+    _, parse_counts = unpack_file(args.raw_csv, args.output_dir, args.chunk_rows, args.workers)
+    print(f"✅ All datasets saved separately. (literal cache: {parse_counts.get('hits', 0)} hits, {parse_counts.get('misses', 0)} misses)")